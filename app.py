@@ -1,3 +1,5 @@
+import io
+
 import streamlit as st
 import requests
 import matplotlib.pyplot as plt
@@ -5,18 +7,8 @@ import pandas as pd
 import plotly.express as px
 import calplot
 from matplotlib.colors import ListedColormap
-from main import faculty_subjects
-
-API_URL = "http://127.0.0.1:5000"
-
-# faculty_subjects = {
-#     "Kavita Patil": "DAA",
-#     "Kirti Deshpande": "DBMS",
-#     "Neeraj Sathawane": "DAV",
-#     "Suhasini Bhat": "BCVS",
-#     "Raj": "CT",
-#     "Kavita Moholkar": "IPR"
-# }
+import client
+from config import DEFAULTER_THRESHOLD
 
 def login():
     st.set_page_config(page_title="Attender", page_icon="📊")
@@ -26,25 +18,35 @@ def login():
     password = st.text_input("Password", type="password")
 
     if st.button("Login"):
-        response = requests.post(f"{API_URL}/login", json={"username": username, "password": password})
+        response = client.login(username, password)
         
         if response.status_code == 200:
             user = response.json()
             st.session_state["username"] = user["username"]
             st.session_state["role"] = user["role"]
             st.session_state["name"] = user["name"]
+            st.session_state["token"] = user["token"]
+            st.session_state["subjects"] = user.get("subjects", [])  # ✅ Faculty subjects come from the server
             st.rerun()
         else:
             st.error("Invalid Credentials")
 
 
+# 📚 Every subject taught by some faculty, from the backend's faculty registry
+def subject_choices():
+    try:
+        return client.fetch_subjects()
+    except requests.RequestException:
+        return []
+
+
 def faculty_dashboard():
     st.set_page_config(page_title="ERP", page_icon="📊")
     st.title("Faculty Dashboard")
     faculty = st.session_state["name"]
-    subject = faculty_subjects.get(faculty, None)
+    taught = st.session_state.get("subjects", [])
 
-    if subject is None:
+    if not taught:
         st.error("Unauthorized Faculty")
         return
 
@@ -52,25 +54,28 @@ def faculty_dashboard():
 
     # Display badges side by side
     col1.badge(f"Faculty Name: {faculty}")
-    col2.badge(f"Subject Name: {subject}")
+    if len(taught) == 1:
+        subject = taught[0]
+        col2.badge(f"Subject Name: {subject}")
+    else:
+        subject = col2.selectbox("Subject", taught)
     
     st.divider()
 
     # Fetch student list from API
-    response = requests.get(f"{API_URL}/get_students")
-    if response.status_code == 200:
-        student_list = response.json()
-    else:
+    try:
+        student_list = client.fetch_students()
+    except requests.RequestException:
         st.error("❌ Failed to fetch student list!")
         student_list = []
-    unique_student_list = list(set(student_list))
-    student = st.selectbox("Select Student", unique_student_list)
+    student = st.selectbox("Select Student", student_list)
     date = st.date_input("Date")
     status = st.selectbox("Attendance", ["Present", "Absent"])
 
     if st.button("Mark Attendance"):
-        response = requests.post(f"{API_URL}/mark_attendance", json={
+        response = client.mark_attendance({
             "faculty": st.session_state["username"],
+            "subject": subject,
             "student": student,
             "date": str(date),
             "status": status
@@ -83,21 +88,56 @@ def faculty_dashboard():
 
     
     if st.button("❌ Delete Selected Attendance"):
-        response = requests.post(f"{API_URL}/delete_attendance", json={
+        response = client.delete_attendance({
             "student": student,
-            "date": str(date)
+            "date": str(date),
+            "subject": subject
         })
 
         if response.status_code == 200:
             st.success("✅ Attendance deleted successfully!")
         else:
             st.error("❌ Failed to delete attendance.")
-    
+
+    st.divider()
+
+    # 🧾 Roster grid: mark the whole class and submit it in one request
+    st.write("### 🧾 **Mark Whole Class**")
+    with st.form("class_roll"):
+        class_date = st.date_input("Class Date", key="class_date")
+        roster = pd.DataFrame({"Student": sorted(student_list), "Status": "Present"})
+        roster = st.data_editor(
+            roster,
+            hide_index=True,
+            use_container_width=True,
+            disabled=["Student"],
+            column_config={
+                "Status": st.column_config.SelectboxColumn("Status", options=["Present", "Absent"], required=True)
+            },
+        )
+        submitted = st.form_submit_button("✅ Submit Class Attendance")
+
+    if submitted:
+        response = client.mark_class({
+            "faculty": st.session_state["username"],
+            "subject": subject,
+            "date": str(class_date),
+            "records": [{"student": row["Student"], "status": row["Status"]} for _, row in roster.iterrows()]
+        })
+
+        if response.status_code == 200:
+            result = response.json()
+            if result["failed"]:
+                st.warning(f"⚠ {result['message']}")
+                st.dataframe(pd.DataFrame([r for r in result["results"] if not r["ok"]]), hide_index=True)
+            else:
+                st.success(f"✅ {result['message']}")
+        else:
+            st.error("❌ Failed to mark class attendance.")
+
     st.divider()
     # 📚 Subject selection dropdown
-    subjects = list(faculty_subjects.values())
-    subjects = sorted(set(subjects))  # Remove duplicates just in case
-    subjects.insert(0, "All")
+    subjects = ["All"] + subject_choices()
     col1, col2 = st.columns([1,2])
     # Subject selectbox in col2
     filter_sub = col1.selectbox("🎯 Select Subject", subjects)
@@ -114,17 +154,24 @@ def faculty_dashboard():
     if view_students:
         st.subheader("📊 All Student Attendance Data")
 
-        response = requests.get(f"{API_URL}/get_all_attendance")
-        if response.status_code == 200:
-            student_data = response.json()
+        # The roster comes from the latest report snapshot unless live figures are asked for
+        live = st.checkbox("🔄 Live figures (include today's marks)")
+        try:
+            student_data, generated_at = client.fetch_roster(fresh=live)
+        except requests.RequestException:
+            student_data = None
+
+        if student_data is not None:
+            if generated_at:
+                st.caption(f"Snapshot taken {pd.Timestamp(generated_at).tz_convert(None):%Y-%m-%d %H:%M} UTC")
             df = pd.DataFrame(student_data)
 
             if not df.empty:
                 df = df.sort_values(by="Roll No")  # Sort by Roll Number
 
-                # Function to highlight students with < 75% attendance in red
+                # Function to highlight students below the defaulter threshold in red
                 def highlight_low_attendance(row):
-                    color = "background-color: red; color: white;" if row["Attendance %"] < 75 else "background-color: green; color: white;"
+                    color = "background-color: red; color: white;" if row["Attendance %"] < DEFAULTER_THRESHOLD else "background-color: green; color: white;"
                     return [color] * len(row)
 
                 # Apply styling and display dataframe
@@ -137,9 +184,71 @@ def faculty_dashboard():
 
     st.divider()
 
+    # 🚨 Defaulter list computed on the server for the whole institution
+    st.write("### 🚨 **Defaulter List**")
+    col1, col2 = st.columns([1, 2])
+    threshold = col1.number_input("Threshold %", min_value=0.0, max_value=100.0, value=DEFAULTER_THRESHOLD, step=5.0)
+    defaulter_subjects = col2.multiselect("Subjects (all if empty)", subject_choices())
+
+    if st.button("🚨 Show Defaulters"):
+        try:
+            defaulter_rows = client.fetch_defaulters(threshold, defaulter_subjects)
+        except requests.RequestException:
+            st.error("❌ Failed to fetch defaulter list!")
+        else:
+            if defaulter_rows:
+                # ✅ One table for the view and the download, same columns as /defaulters?format=csv
+                defaulter_table = pd.DataFrame([{
+                    "Roll No": row["student"],
+                    "Name": row["name"],
+                    "Present Days": row["overall"]["present"],
+                    "Total Classes": row["overall"]["total"],
+                    "Attendance %": row["overall"]["percentage"],
+                    "Below Threshold In": "; ".join(row["below_threshold"]),
+                } for row in defaulter_rows])
+                st.dataframe(
+                    defaulter_table[["Roll No", "Name", "Attendance %", "Below Threshold In"]],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+                st.download_button(
+                    "⬇ Download CSV",
+                    defaulter_table.to_csv(index=False),
+                    file_name="defaulters.csv",
+                    mime="text/csv",
+                )
+            else:
+                st.success("✅ No defaulters!")
+
+    st.divider()
+
+    # 📉 Students whose rolling attendance is falling, steepest decline first
+    st.write("### 📉 **Declining Students**")
+    trend_subject = st.selectbox("Subject", subject_choices(), key="trend_subject")
+
+    if st.button("📉 Show Declining Students") and trend_subject:
+        try:
+            cohort = client.fetch_subject_trends(trend_subject)
+        except requests.RequestException:
+            st.error("❌ Failed to fetch attendance trends!")
+        else:
+            declining = [row for row in cohort["students"] if row["change"] is not None and row["change"] < 0]
+            if declining:
+                st.dataframe(pd.DataFrame([{
+                    "Roll No": row["student"],
+                    f"Rolling {cohort['window']}-week %": row["rolling_percentage"],
+                    "Change": row["change"],
+                    "Current Absence Streak": row["current_absent"],
+                    "Longest Absence Streak": row["longest_absent"],
+                } for row in declining]), hide_index=True, use_container_width=True)
+            else:
+                st.success("✅ No student is declining!")
+
+    st.divider()
+
     # 📌 Attendance Analysis Section for Faculty
     st.write("### 📊 **View Student's Attendance Analysis**")
-    student_for_analysis = st.selectbox("Select a Student for Analysis", unique_student_list, key="analysis_student")
+    student_for_analysis = st.selectbox("Select a Student for Analysis", student_list, key="analysis_student")
 
     if st.button("📉 Show Attendance Analysis"):
         fetch_and_plot_student_attendance(student_for_analysis)
@@ -152,31 +261,19 @@ def student_dashboard():
     st.text(f"Name: {st.session_state['name']}")
     st.text(f"PRN: {student}")
     
-    response = requests.get(f"{API_URL}/get_attendance/{student}")
+    try:
+        summary = client.fetch_summary(student)
+    except requests.RequestException:
+        summary = None
 
-    if response.status_code == 200:
-        data = response.json()
-        
-        if not data:
+    if summary is not None:
+        if not summary["subjects"]:
             st.warning("⚠ No attendance records found!")
             return
-        
-        subject_attendance = {}
-
-        for record in data:
-            subject = record.get("subject", "Unknown")
-            status = record.get("status", "Absent")  
-
-            if subject == "Unknown":
-                continue  
 
-            if subject not in subject_attendance:
-                subject_attendance[subject] = {"Present": 0, "Total": 0}
+        # Per-subject counts come from the server; only records without a subject are left out here
+        subject_attendance = subject_attendance_from_summary(summary, skip_unknown=True)
 
-            subject_attendance[subject]["Total"] += 1
-            if status == "Present":
-                subject_attendance[subject]["Present"] += 1
-        
         overall_total = sum(stats["Total"] for stats in subject_attendance.values())
         overall_present = sum(stats["Present"] for stats in subject_attendance.values())
         overall_percent = (overall_present / overall_total) * 100 if overall_total > 0 else 0
@@ -190,7 +287,7 @@ def student_dashboard():
             percent = (stats["Present"] / stats["Total"]) * 100 if stats["Total"] > 0 else 0
             st.write(f"**{subject}:** {percent:.2f}% ({stats['Present']}/{stats['Total']})")
         
-        if overall_percent < 75:
+        if overall_percent < DEFAULTER_THRESHOLD:
             st.error(f"⚠️ Overall Attendance: {overall_percent:.2f}% (Defaulter)")
         else:
             st.success(f"✅ Overall Attendance: {overall_percent:.2f}% (Not Defaulter)")
@@ -198,9 +295,7 @@ def student_dashboard():
         st.divider()
 
         # 📚 Subject selection dropdown
-        subjects = list(faculty_subjects.values())
-        subjects = sorted(set(subjects))  # Remove duplicates just in case
-        subjects.insert(0, "All")
+        subjects = ["All"] + subject_choices()
         col1, col2 = st.columns([1,2])
         # Subject selectbox in col2
         filter_sub = col1.selectbox("🎯 Select Subject", subjects)
@@ -245,71 +340,71 @@ def plot_attendance_graph(subject_attendance, overall_present, overall_total):
     st.pyplot(fig)
 
 
+# 📌 Convert an /attendance_summary response into {subject: {"Present": n, "Total": n}}
+def subject_attendance_from_summary(summary, skip_unknown=False):
+    return {
+        row["subject"]: {"Present": row["present"], "Total": row["total"]}
+        for row in summary["subjects"]
+        if not (skip_unknown and row["subject"] == "Unknown")
+    }
+
+
 # 📌 Function to Fetch & Plot Student Attendance for Faculty
 def fetch_and_plot_student_attendance(student):
-    response = requests.get(f"{API_URL}/get_attendance/{student}")
-    
-    if response.status_code == 200:
-        data = response.json()
-        subject_attendance = {}
-        
-        for record in data:
-            subject = record.get("subject", "Unknown")
-            status = record.get("status", "Absent")
-            
-            if subject not in subject_attendance:
-                subject_attendance[subject] = {"Present": 0, "Total": 0}
+    try:
+        summary = client.fetch_summary(student)
+    except requests.RequestException:
+        summary = None
 
-            subject_attendance[subject]["Total"] += 1
-            if status == "Present":
-                subject_attendance[subject]["Present"] += 1
+    if summary is not None:
+        subject_attendance = subject_attendance_from_summary(summary)
 
-        overall_total = sum(stats["Total"] for stats in subject_attendance.values())
-        overall_present = sum(stats["Present"] for stats in subject_attendance.values())
-
-        plot_attendance_graph(subject_attendance, overall_present, overall_total)
+        plot_attendance_graph(subject_attendance, summary["overall"]["present"], summary["overall"]["total"])
+        plot_attendance_trend(student)
     
     else:
         st.error("❌ Failed to fetch student attendance data.")
 
 
-# Function to fetch attendance data
-def fetch_attendance(student):
-    response = requests.get(f"{API_URL}/get_attendance/{student}")
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return []
+# 📌 Weekly rolling attendance % and absence streaks, computed by the backend
+def plot_attendance_trend(student):
+    try:
+        trends = client.fetch_trends(student)
+    except requests.RequestException:
+        st.error("❌ Failed to fetch attendance trend.")
+        return
 
-# Function to plot attendance calendar
-def plot_attendance_calendar(student_name, subject_filter=None):
-    if subject_filter == "All":
-        subject_filter = None
-    # Fetch attendance data
-    attendance_data = fetch_attendance(student_name)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Current absence streak", f"{trends['current_absent']} days")
+    col2.metric("Longest absence streak", f"{trends['longest_absent']} days")
+    col3.metric(f"Rolling {trends['window']}-week %", f"{trends['rolling_percentage']:.2f}%",
+                delta=f"{trends['change']:.2f}%" if trends["change"] is not None else None)
 
-    if not attendance_data:
-        st.warning("No attendance data found.")
+    if not trends["series"]:
         return
+    df = pd.DataFrame(trends["series"]).set_index("period")
+    fig, ax = plt.subplots(figsize=(6, 3))
+    df[["percentage", "rolling_percentage"]].plot(ax=ax, marker="o")
+    ax.axhline(DEFAULTER_THRESHOLD, color="red", linestyle="--", linewidth=1)
+    ax.set_ylabel("Attendance Percentage")
+    ax.set_title("📈 Weekly Attendance Trend")
+    st.pyplot(fig)
 
-    # Create DataFrame
-    df = pd.DataFrame(attendance_data)
+
+# Function to render the attendance calendar as PNG bytes
+# Cached per (student, subject, data version); the leading underscore keeps `_days` out of the cache key
+@st.cache_data(max_entries=256, show_spinner=False)
+def render_attendance_calendar(student_name, subject_filter, version, _days):
+    df = pd.DataFrame(_days)
     df["date"] = pd.to_datetime(df["date"])
-    
-    # Optional subject filtering
-    if subject_filter:
-        df = df[df["subject"] == subject_filter]
-    
+
     # Map status to numeric values
     status_map = {
         "Absent": 0,       # Red
         "No College": 1,   # Grey
         "Present": 2       # Green
     }
-    df["status_value"] = df["status"].map(status_map)
-
-    # Group by date
-    daily_status = df.groupby("date")["status_value"].first()
+    daily_status = df.set_index("date")["status"].map(status_map)
 
     # Custom color map: Red, Grey, Green
     custom_cmap = ListedColormap(["#ff0000", "#d3d3d3", "#00cc44"])
@@ -325,9 +420,29 @@ def plot_attendance_calendar(student_name, subject_filter=None):
         colorbar=False,
         yearlabel_kws={'fontsize': 16},
     )
-    
-    # Display in Streamlit
-    st.pyplot(fig)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+# Function to plot attendance calendar
+def plot_attendance_calendar(student_name, subject_filter=None):
+    if subject_filter == "All":
+        subject_filter = None
+    # Fetch the per-day series (already reduced to one status per day by the server)
+    try:
+        calendar = client.fetch_calendar(student_name, subject_filter)
+    except requests.RequestException:
+        calendar = None
+
+    if not calendar or not calendar["days"]:
+        st.warning("No attendance data found.")
+        return
+
+    # Display in Streamlit (re-rendered only when the data version changes)
+    st.image(render_attendance_calendar(student_name, subject_filter, calendar["version"], calendar["days"]))
 
 
 def main():
@@ -5,7 +5,6 @@ import pandas as pd
 import plotly.express as px
 import calplot
 from matplotlib.colors import ListedColormap
-from app import faculty_subjects
 
 API_URL = "http://127.0.0.1:5000"
 
@@ -33,6 +32,8 @@ def login():
             st.session_state["username"] = user["username"]
             st.session_state["role"] = user["role"]
             st.session_state["name"] = user["name"]
+            st.session_state["token"] = user["token"]
+            st.session_state["subjects"] = user.get("subjects", [])
             st.rerun()
         else:
             st.error("Invalid Credentials")
@@ -42,7 +43,7 @@ def faculty_dashboard():
     st.set_page_config(page_title="ERP", page_icon="📊")
     st.title("Faculty Dashboard")
     faculty = st.session_state["name"]
-    subject = faculty_subjects.get(faculty, None)
+    subject = next(iter(st.session_state.get("subjects", [])), None)
 
     if subject is None:
         st.error("Unauthorized Faculty")
@@ -63,18 +64,18 @@ def faculty_dashboard():
     else:
         st.error("❌ Failed to fetch student list!")
         student_list = []
-    unique_student_list = list(set(student_list))
-    student = st.selectbox("Select Student", unique_student_list)
+    student = st.selectbox("Select Student", student_list)
     date = st.date_input("Date")
     status = st.selectbox("Attendance", ["Present", "Absent"])
 
     if st.button("Mark Attendance"):
         response = requests.post(f"{API_URL}/mark_attendance", json={
             "faculty": st.session_state["username"],
+            "subject": subject,
             "student": student,
             "date": str(date),
             "status": status
-        })
+        }, headers={"Authorization": f"Bearer {st.session_state['token']}"})
 
         if response.status_code == 200:
             st.success("✅ Attendance marked successfully!")
@@ -85,8 +86,9 @@ def faculty_dashboard():
     if st.button("❌ Delete Selected Attendance"):
         response = requests.post(f"{API_URL}/delete_attendance", json={
             "student": student,
-            "date": str(date)
-        })
+            "date": str(date),
+            "subject": subject
+        }, headers={"Authorization": f"Bearer {st.session_state['token']}"})
 
         if response.status_code == 200:
             st.success("✅ Attendance deleted successfully!")
@@ -131,7 +133,7 @@ def faculty_dashboard():
 
     # 📌 Attendance Analysis Section for Faculty
     st.write("### 📊 **View Student's Attendance Analysis**")
-    student_for_analysis = st.selectbox("Select a Student for Analysis", unique_student_list, key="analysis_student")
+    student_for_analysis = st.selectbox("Select a Student for Analysis", student_list, key="analysis_student")
 
     if st.button("📉 Show Attendance Analysis"):
         fetch_and_plot_student_attendance(student_for_analysis)
@@ -190,8 +192,7 @@ def student_dashboard():
         st.divider()
 
          # 📚 Subject selection dropdown
-        subjects = list(faculty_subjects.values())
-        subjects = sorted(set(subjects))  # Remove duplicates just in case
+        subjects = requests.get(f"{API_URL}/subjects").json()["subjects"]
         subjects.insert(0, "All")
         col1, col2 = st.columns([1,2])
         # Subject selectbox in col2
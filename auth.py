@@ -0,0 +1,115 @@
+"""Password hashing and signed session tokens.
+
+Passwords are stored as ``password_hash`` using ``PASSWORD_HASH_METHOD``
+(any werkzeug method, e.g. ``scrypt:32768:8:1`` or ``pbkdf2:sha256:600000``,
+so the cost can be tuned per deployment). Accounts still holding a legacy
+plaintext ``password`` are upgraded the first time they log in, or all at
+once with ``python manage.py hash-passwords``.
+
+``/login`` returns a token signed with ``SECRET_KEY``. Protected routes
+verify the signature and age on every request without touching MongoDB;
+the decoded claims are memoised per token so repeat requests skip the
+HMAC and JSON work too.
+"""
+import hmac
+from functools import lru_cache
+from time import time
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config import PASSWORD_HASH_METHOD, SECRET_KEY, SESSION_TTL_SECONDS
+
+TOKEN_SALT = "attender-session"
+# Never returned to clients
+CREDENTIAL_FIELDS = ("password", "password_hash")
+
+_serializer = URLSafeTimedSerializer(SECRET_KEY, salt=TOKEN_SALT)
+
+
+class AuthError(Exception):
+    """Missing, malformed, expired or forged token; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.status = status
+
+
+def hash_password(password, method=PASSWORD_HASH_METHOD):
+    return generate_password_hash(password, method=method)
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    # werkzeug fills in default parameters ("scrypt" -> "scrypt:32768:8:1"), so ask it
+    return generate_password_hash("", method=method).split("$", 1)[0] + "$"
+
+
+def needs_rehash(password_hash, method=PASSWORD_HASH_METHOD):
+    """True when ``password_hash`` was made with other parameters than ``method``."""
+    return not password_hash.startswith(_method_prefix(method))
+
+
+def check_password(user, password):
+    """Check ``password`` against a user document.
+
+    Returns ``(ok, new_hash)``; ``new_hash`` is set when the stored credential
+    is plaintext or was hashed with an outdated method and should be replaced.
+    """
+    if not user or not isinstance(password, str):
+        return False, None
+    if "password_hash" in user:
+        if not check_password_hash(user["password_hash"], password):
+            return False, None
+        return True, hash_password(password) if needs_rehash(user["password_hash"]) else None
+    legacy = user.get("password")
+    if isinstance(legacy, str) and hmac.compare_digest(legacy.encode(), password.encode()):
+        return True, hash_password(password)
+    return False, None
+
+
+def credential_update(new_hash):
+    """Update document replacing whatever credential a user had with ``new_hash``."""
+    return {"$set": {"password_hash": new_hash}, "$unset": {"password": ""}}
+
+
+def public_user(user):
+    return {key: value for key, value in user.items() if key not in CREDENTIAL_FIELDS and key != "_id"}
+
+
+def issue_token(user):
+    """Signed session token carrying the user's username and role."""
+    return _serializer.dumps({"username": user["username"], "role": user["role"]})
+
+
+@lru_cache(maxsize=4096)
+def _decode(token):
+    # Only valid tokens are cached: BadSignature propagates and lru_cache stores nothing
+    return _serializer.loads(token, return_timestamp=True)
+
+
+def verify_token(token, max_age=SESSION_TTL_SECONDS):
+    """Claims of a valid, unexpired token; raises AuthError otherwise."""
+    try:
+        claims, signed_at = _decode(token)
+    except BadSignature:
+        raise AuthError("Invalid session token") from None
+    if time() - signed_at.timestamp() > max_age:
+        raise AuthError("Session expired, log in again")
+    return claims
+
+
+def bearer_token(authorization):
+    """Extract the token from an ``Authorization: Bearer <token>`` header value."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise AuthError("Missing bearer token")
+    return token.strip()
+
+
+def authenticate(authorization, role=None):
+    """Claims for an Authorization header value, optionally requiring ``role`` (403 otherwise)."""
+    claims = verify_token(bearer_token(authorization))
+    if role and claims["role"] != role:
+        raise AuthError(f"Only {role} users can do this", status=403)
+    return claims
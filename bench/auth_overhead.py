@@ -0,0 +1,78 @@
+"""Per-request cost of authentication, compared with a users lookup per request.
+
+Measures, in process:
+
+* ``authenticate()`` on a bearer token the first time it is seen (HMAC + JSON
+  decode) and on repeat requests (memoised claims);
+* the ``users.find_one({"username": ...})`` round trip that every mark used
+  to pay, when a MongoDB is reachable (``--mongo-uri``, seeded with
+  ``python manage.py seed``);
+* one password check per hash method, which is paid at login only::
+
+    python bench/auth_overhead.py
+    python bench/auth_overhead.py --methods scrypt:32768:8:1 pbkdf2:sha256:600000 --no-mongo
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import auth  # noqa: E402
+from config import MONGO_URI, PASSWORD_HASH_METHOD  # noqa: E402
+
+
+def per_call_us(fn, repeat):
+    """Mean microseconds per ``fn()`` call over ``repeat`` calls."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attender auth overhead benchmark")
+    parser.add_argument("--repeat", type=int, default=20000, help="Calls per token/DB measurement")
+    parser.add_argument("--methods", nargs="+", default=[PASSWORD_HASH_METHOD], help="Password hash methods to time")
+    parser.add_argument("--mongo-uri", default=MONGO_URI)
+    parser.add_argument("--no-mongo", action="store_true", help="Skip the users lookup measurement")
+    args = parser.parse_args(argv)
+
+    header = "Bearer " + auth.issue_token({"username": "kavitapatil", "role": "faculty"})
+
+    def cold():
+        auth._decode.cache_clear()
+        auth.authenticate(header, "faculty")
+
+    rows = [
+        ("token verify (first use)", per_call_us(cold, args.repeat)),
+        ("token verify (cached)", per_call_us(lambda: auth.authenticate(header, "faculty"), args.repeat)),
+    ]
+
+    if not args.no_mongo:
+        try:
+            users = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=2000).get_default_database().users
+            users.find_one({"username": "kavitapatil"})
+            repeat = max(1, args.repeat // 10)
+            rows.append(("users.find_one per request", per_call_us(
+                lambda: users.find_one({"username": "kavitapatil"}, {"_id": 0, "name": 1}), repeat
+            )))
+        except PyMongoError as e:
+            print(f"skipping users lookup: {e}")
+
+    for method in args.methods:
+        user = {"password_hash": auth.hash_password("pass123", method=method)}
+        rows.append((f"login password check {method}", per_call_us(lambda: auth.check_password(user, "pass123"), 5)))
+
+    print(f"{'operation':<48} {'µs/call':>12}")
+    for name, micros in rows:
+        print(f"{name:<48} {micros:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
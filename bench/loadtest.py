@@ -0,0 +1,143 @@
+"""HTTP load test for the Attender API, for the Flask app or the async backend.
+
+Start a local mongod, seed it (``python manage.py seed``) and run the servers::
+
+    CACHE_TTL_SECONDS=0 python main.py                  # Flask on :5000, read cache off
+    hypercorn main_async:app --bind 127.0.0.1:8000      # ASGI on :8000
+
+Then drive one or compare both with the same workload::
+
+    python bench/loadtest.py --url http://127.0.0.1:5000 --scenario mark
+    python bench/loadtest.py --compare flask=http://127.0.0.1:5000 asgi=http://127.0.0.1:8000
+
+Scenarios: ``mark`` (POST /mark_attendance), ``history`` (GET
+/get_attendance/<student>), ``roster`` (GET /get_all_attendance) and
+``mixed`` (70% history, 20% mark, 10% roster). Reports throughput and
+p50/p95/p99 latency. Requires ``httpx``.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from seed import default_users  # noqa: E402
+
+FACULTY = [user for user in default_users if user["role"] == "faculty"]
+FIRST_DAY = date(2025, 1, 1)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, round(pct / 100 * len(samples)) - 1))
+    return samples[rank]
+
+
+async def login_faculty(client):
+    """Session tokens for the seeded faculty, keyed by username."""
+    tokens = {}
+    for user in FACULTY:
+        response = await client.post("/login", json={"username": user["username"], "password": user["password"]})
+        response.raise_for_status()
+        tokens[user["username"]] = response.json()["token"]
+    return tokens
+
+
+def make_request(scenario, students, tokens, rng):
+    """``(method, path, json body, headers)`` for one request of ``scenario``."""
+    if scenario == "mixed":
+        scenario = rng.choices(["history", "mark", "roster"], weights=[70, 20, 10])[0]
+    if scenario == "mark":
+        faculty = rng.choice(FACULTY)
+        return "POST", "/mark_attendance", {
+            "subject": faculty["subjects"][0],
+            "student": rng.choice(students),
+            "date": str(FIRST_DAY + timedelta(days=rng.randrange(120))),
+            "status": rng.choice(["Present", "Present", "Present", "Absent"]),
+        }, {"Authorization": f"Bearer {tokens[faculty['username']]}"}
+    if scenario == "history":
+        return "GET", f"/get_attendance/{rng.choice(students)}", None, None
+    if scenario == "roster":
+        return "GET", "/get_all_attendance", None, None
+    raise ValueError(f"unknown scenario {scenario!r}")
+
+
+async def run_load(base_url, scenario, concurrency, total, seed=1, timeout=30.0):
+    """Send ``total`` requests from ``concurrency`` workers; returns a result dict."""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        students = (await client.get("/get_students")).json() or ["RBT23CB001"]
+        tokens = await login_faculty(client)
+        rng = random.Random(seed)
+        requests = [make_request(scenario, students, tokens, rng) for _ in range(total)]
+        queue = iter(requests)
+        latencies, errors = [], 0
+
+        async def worker():
+            nonlocal errors
+            for method, path, body, headers in queue:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body, headers=headers)
+                    await response.aread()
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                latencies.append(time.perf_counter() - started)
+                errors += failed
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def print_results(rows):
+    print(f"{'target':<10} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, result in rows:
+        print(f"{name:<10} {result['throughput']:>9.1f} {result['p50_ms']:>9.2f} "
+              f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['errors']:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attender API load test")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of one server")
+    target.add_argument("--compare", nargs="+", metavar="NAME=URL", help="Run the same workload against several servers")
+    parser.add_argument("--scenario", default="mixed", choices=["mark", "history", "roster", "mixed"])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200, help="Requests sent before measuring")
+    args = parser.parse_args(argv)
+
+    targets = [("server", args.url)] if args.url else [tuple(item.split("=", 1)) for item in args.compare]
+    rows = []
+    for name, url in targets:
+        if args.warmup:
+            asyncio.run(run_load(url, args.scenario, args.concurrency, args.warmup, seed=0))
+        rows.append((name, asyncio.run(run_load(url, args.scenario, args.concurrency, args.requests))))
+    print(f"scenario={args.scenario} concurrency={args.concurrency} requests={args.requests}")
+    print_results(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Throughput of the gunicorn deployment as worker processes are added.
+
+For each ``--workers`` count, starts ``gunicorn -c gunicorn.conf.py`` with
+that many workers (``--threads`` each) against ``--mongo-uri``, waits until
+it answers, then runs the loadtest.py workload and stops it again::
+
+    python manage.py seed
+    python bench/scaling.py --workers 1 2 4 8 --scenario mixed
+    python bench/scaling.py --workers 1 2 4 --threads 1 --scenario history --requests 20000
+
+Reports req/s, speedup over the first row and p50/p95 latency. The read
+cache is off (CACHE_TTL_SECONDS=0) so every request reaches MongoDB; the
+client load generator needs a core of its own, so expect the curve to
+flatten at the machine's core count minus one. Requires ``gunicorn`` and
+``httpx``; marks are written to the target database.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import MONGO_URI  # noqa: E402
+from loadtest import run_load  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def start_server(workers, threads, port, mongo_uri):
+    env = {
+        **os.environ,
+        "MONGO_URI": mongo_uri,
+        "WEB_BIND": f"127.0.0.1:{port}",
+        "WEB_WORKERS": str(workers),
+        "WEB_THREADS": str(threads),
+        "CACHE_TTL_SECONDS": "0",
+        "SECRET_KEY": "scaling-benchmark",  # one key for all workers, or tokens fail on the others
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+
+
+def wait_until_ready(url, server, timeout=60.0):
+    """Poll until the server answers; raises RuntimeError if it died or never answered."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited: {server.stderr.read().decode(errors='replace')[-2000:]}")
+        try:
+            if httpx.get(f"{url}/get_students", timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not answer within {timeout:.0f}s")
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attender throughput vs. gunicorn workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker")
+    parser.add_argument("--mongo-uri", default=MONGO_URI, help="Seeded MongoDB database")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--scenario", default="mixed", choices=["mark", "history", "roster", "mixed"])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=500, help="Requests sent before measuring (warms every worker)")
+    args = parser.parse_args(argv)
+
+    url = f"http://127.0.0.1:{args.port}"
+    rows = []
+    for workers in args.workers:
+        server = start_server(workers, args.threads, args.port, args.mongo_uri)
+        try:
+            wait_until_ready(url, server)
+            if args.warmup:
+                asyncio.run(run_load(url, args.scenario, args.concurrency, args.warmup, seed=0))
+            result = asyncio.run(run_load(url, args.scenario, args.concurrency, args.requests))
+        finally:
+            stop_server(server)
+        rows.append((workers, result))
+        print(f"… {workers} workers: {result['throughput']:.1f} req/s")
+
+    print(f"scenario={args.scenario} threads={args.threads} concurrency={args.concurrency} requests={args.requests}")
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+    base = rows[0][1]["throughput"]
+    for workers, result in rows:
+        speedup = result["throughput"] / base if base else 0.0
+        print(f"{workers:>7} {result['throughput']:>9.1f} {speedup:>7.2f}x {result['p50_ms']:>9.2f} "
+              f"{result['p95_ms']:>9.2f} {result['errors']:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
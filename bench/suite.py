@@ -0,0 +1,366 @@
+"""Reproducible benchmark suite for the Flask API (main.py), run in process.
+
+Seeds a dedicated database with ``--students`` × ``--subjects`` × ``--days``
+marks (one faculty per subject), imports ``main`` against it and drives each
+route through the Flask test client from ``--concurrency`` threads. For every
+route it reports throughput, p50/p95/p99 latency, MongoDB operations per
+request and errors::
+
+    python bench/suite.py --mongo-uri mongodb://localhost:27017/attender_bench
+    python bench/suite.py --students 2000 --days 120 --routes get_all_attendance get_attendance
+    python bench/suite.py --mongomock --students 50      # no server needed, see below
+
+The seeded database is dropped and recreated: never point ``--mongo-uri``
+at real data. The read cache is off unless ``--cache`` is given, so reads
+measure the database path.
+
+Baselines: ``--save`` stores the results in bench/baselines.json under a
+label made of backend, dataset size and concurrency; ``--check`` compares a
+run with the stored baseline for the same label and exits 1 when a route
+issues more DB operations per request, has a p95 above the baseline by more
+than ``--latency-tolerance``, or returns more errors. The committed
+``mongomock-20x2x10-c1`` baseline keeps only the machine-independent figures
+(DB operations and errors, no latencies), so a DB-op regression fails on any
+checkout::
+
+    python bench/suite.py --mongomock --students 20 --subjects 2 --days 10 --requests 50 --check
+
+``--mongomock`` replaces MongoDB with mongomock. It is not thread-safe, so
+requests run one at a time, and it does not implement ``$lookup``
+sub-pipelines or ``$round``, so the roster, summary and defaulter routes
+report errors there; use it for the other routes and for DB-op counts.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+from pymongo import MongoClient, monitoring
+from pymongo.errors import OperationFailure
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loadtest import percentile  # noqa: E402
+
+BASELINES = Path(__file__).resolve().parent / "baselines.json"
+FIRST_DAY = date(2025, 1, 1)
+PASSWORD = "bench123"
+# Connection housekeeping, not work done for a request
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue"}
+COUNTED_METHODS = (
+    "find", "find_one", "aggregate", "bulk_write", "insert_one", "insert_many", "update_one", "update_many",
+    "delete_one", "delete_many", "find_one_and_delete", "count_documents", "estimated_document_count", "distinct",
+)
+
+
+class OpCounter(monitoring.CommandListener):
+    """Counts MongoDB commands sent by every client created after it is registered."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, n=1):
+        with self._lock:
+            self.count += n
+
+    def started(self, event):
+        if event.command_name not in IGNORED_COMMANDS:
+            self.add()
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def use_mongomock(counter):
+    """Point flask_pymongo at one shared mongomock client whose collection calls are counted."""
+    import flask_pymongo
+    import mongomock
+
+    client = mongomock.MongoClient()
+    flask_pymongo.MongoClient = lambda *args, **kwargs: client
+
+    # Only count the route's own calls, not mongomock's internal ones (aggregate -> find, ...)
+    depth = threading.local()
+    collection = mongomock.collection.Collection
+    for name in COUNTED_METHODS:
+        def counted(self, *args, _method=getattr(collection, name), **kwargs):
+            nested = getattr(depth, "value", 0)
+            if not nested:
+                counter.add()
+            depth.value = nested + 1
+            try:
+                return _method(self, *args, **kwargs)
+            finally:
+                depth.value = nested
+        setattr(collection, name, counted)
+
+    # mongomock has no change streams; fail like a standalone server so the faculty registry polls
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", 40573)
+    collection.watch = watch
+    return client
+
+
+def seed_dataset(db, students, subjects, days, seed=1):
+    """Replace the bench database with a synthetic roster. Returns ``(students, subjects, faculty)``."""
+    from auth import hash_password
+    from indexes import ensure_indexes
+    from marks import rebuild_stats
+
+    for name in ("users", "attendance", "attendance_stats"):
+        db.drop_collection(name)
+
+    student_names = [f"BENCH{n:05d}" for n in range(students)]
+    subject_names = [f"S{n:02d}" for n in range(subjects)]
+    faculty = {f"faculty{subject.lower()}": subject for subject in subject_names}
+    password_hash = hash_password(PASSWORD)  # one hash shared by every bench user
+
+    db.users.insert_many(
+        [{"username": username, "password_hash": password_hash, "role": "faculty", "name": username,
+          "subjects": [subject]} for username, subject in faculty.items()]
+        + [{"username": username, "password_hash": password_hash, "role": "student", "name": username}
+           for username in student_names]
+    )
+
+    rng = random.Random(seed)
+    batch = []
+    for day in range(days):
+        day = str(FIRST_DAY + timedelta(days=day))
+        for subject, marked_by in zip(subject_names, faculty):
+            for student in student_names:
+                batch.append({
+                    "student": student, "date": day, "subject": subject, "marked_by": marked_by,
+                    "status": "Present" if rng.random() < 0.8 else "Absent",
+                })
+                if len(batch) >= 10000:
+                    db.attendance.insert_many(batch)
+                    batch = []
+    if batch:
+        db.attendance.insert_many(batch)
+
+    ensure_indexes(db)
+    rebuild_stats(db)
+    return student_names, subject_names, faculty
+
+
+class Workload:
+    """Builds ``(method, path, json body, headers)`` requests for each route."""
+
+    def __init__(self, students, subjects, faculty, days, tokens, seed=1):
+        self.students, self.subjects, self.days = students, subjects, days
+        self.faculty = list(faculty.items())
+        self.tokens = tokens
+        self.rng = random.Random(seed)
+        # Every (student, day) is deleted at most once
+        self.deletions = iter(self.rng.sample([(s, d) for s in students for d in range(days)], len(students) * days))
+
+    def day(self, offset=None):
+        return str(FIRST_DAY + timedelta(days=self.rng.randrange(self.days) if offset is None else offset))
+
+    def auth(self, username):
+        return {"Authorization": f"Bearer {self.tokens[username]}"}
+
+    def request(self, route):
+        rng = self.rng
+        student = rng.choice(self.students)
+        username, subject = rng.choice(self.faculty)
+        if route == "get_all_attendance":
+            return "GET", "/get_all_attendance", None, None
+        if route == "get_all_attendance?subject":
+            return "GET", f"/get_all_attendance?subject={subject}", None, None
+        if route == "get_attendance":
+            return "GET", f"/get_attendance/{student}", None, None
+        if route == "get_attendance?limit":
+            return "GET", f"/get_attendance/{student}?limit=100", None, None
+        if route == "attendance_summary":
+            return "GET", f"/attendance_summary/{student}", None, None
+        if route == "calendar":
+            return "GET", f"/calendar/{student}", None, None
+        if route == "defaulters":
+            return "GET", "/defaulters", None, None
+        if route == "get_students":
+            return "GET", "/get_students", None, None
+        if route == "subjects":
+            return "GET", "/subjects", None, None
+        if route == "login":
+            return "POST", "/login", {"username": username, "password": PASSWORD}, None
+        if route == "mark_attendance":
+            return "POST", "/mark_attendance", {
+                "student": student, "date": self.day(), "status": rng.choice(["Present", "Absent"]),
+            }, self.auth(username)
+        if route == "mark_attendance/bulk":
+            return "POST", "/mark_attendance/bulk", {
+                "date": self.day(),
+                "records": [{"student": s, "status": rng.choice(["Present", "Absent"])} for s in self.students],
+            }, self.auth(username)
+        if route == "delete_attendance":
+            student, day = next(self.deletions)
+            return "POST", "/delete_attendance", {"student": student, "date": self.day(day)}, self.auth(username)
+        raise ValueError(f"unknown route {route!r}")
+
+
+# Writes last, deletes at the very end, so reads see the seeded data
+ROUTES = [
+    "get_all_attendance", "get_all_attendance?subject", "get_attendance", "get_attendance?limit",
+    "attendance_summary", "calendar", "defaulters", "get_students", "subjects",
+    "login", "mark_attendance", "mark_attendance/bulk", "delete_attendance",
+]
+
+
+def run_route(app, workload, route, concurrency, total, counter):
+    """Send ``total`` requests for ``route`` from ``concurrency`` threads; returns a result dict."""
+    requests = [workload.request(route) for _ in range(total)]
+    queue = iter(requests)
+    lock = threading.Lock()
+    latencies, errors = [], 0
+
+    def worker():
+        nonlocal errors
+        client = app.test_client()
+        while True:
+            with lock:
+                item = next(queue, None)
+            if item is None:
+                return
+            method, path, body, headers = item
+            started = time.perf_counter()
+            response = client.open(path, method=method, json=body, headers=headers)
+            response.get_data()  # drain streamed bodies
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors += response.status_code >= 400
+
+    ops_before = counter.count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput": total / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "ops_per_request": (counter.count - ops_before) / total,
+    }
+
+
+def print_results(results):
+    print(f"{'route':<28} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/req':>8} {'errors':>7}")
+    for route, result in results.items():
+        print(f"{route:<28} {result['throughput']:>9.1f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+              f"{result['p99_ms']:>9.2f} {result['ops_per_request']:>8.2f} {result['errors']:>7}")
+
+
+def check_baseline(results, baseline, latency_tolerance):
+    """Regression messages for ``results`` against ``baseline`` (empty when everything is within bounds)."""
+    failures = []
+    for route, result in results.items():
+        base = baseline.get(route)
+        if base is None:
+            continue
+        if result["ops_per_request"] > base["ops_per_request"] + 0.01:
+            failures.append(f"{route}: {result['ops_per_request']:.2f} DB ops/request, baseline {base['ops_per_request']:.2f}")
+        if "p95_ms" in base and result["p95_ms"] > base["p95_ms"] * (1 + latency_tolerance):
+            failures.append(f"{route}: p95 {result['p95_ms']:.2f} ms, baseline {base['p95_ms']:.2f} ms")
+        if result["errors"] > base["errors"]:
+            failures.append(f"{route}: {result['errors']} errors, baseline {base['errors']}")
+    return failures
+
+
+def load_baselines():
+    return json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attender API benchmark suite")
+    backend = parser.add_mutually_exclusive_group()
+    backend.add_argument("--mongo-uri", default="mongodb://localhost:27017/attender_bench",
+                         help="Database to seed and benchmark (dropped first)")
+    backend.add_argument("--mongomock", action="store_true", help="Use mongomock instead of a MongoDB server")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--subjects", type=int, default=6)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, default=ROUTES)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per route")
+    parser.add_argument("--cache", action="store_true", help="Keep the read cache on")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", action="store_true", help="Store the results as the baseline for this label")
+    parser.add_argument("--check", action="store_true", help="Exit 1 on regressions against the stored baseline")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="Allowed p95 growth (0.5 = +50%%)")
+    args = parser.parse_args(argv)
+
+    # main.py copies these settings when it is imported
+    import config
+    if not args.cache:
+        config.CACHE_TTL_SECONDS = 0
+    config.WRITE_BEHIND = False
+    counter = OpCounter()
+    if args.mongomock:
+        args.concurrency = 1
+        config.MONGO_URI = "mongodb://localhost:27017/attender_bench"
+        db = use_mongomock(counter)["attender_bench"]
+    else:
+        config.MONGO_URI = args.mongo_uri
+        monitoring.register(counter)
+        db = MongoClient(args.mongo_uri).get_default_database()
+
+    started = time.perf_counter()
+    students, subjects, faculty = seed_dataset(db, args.students, args.subjects, args.days, seed=args.seed)
+    print(f"seeded {args.students * args.subjects * args.days} marks in {time.perf_counter() - started:.1f}s")
+
+    from main import app
+
+    client = app.test_client()
+    tokens = {username: client.post("/login", json={"username": username, "password": PASSWORD}).json["token"]
+              for username in faculty}
+    workload = Workload(students, subjects, faculty, args.days, tokens, seed=args.seed)
+
+    results = {}
+    for route in [route for route in ROUTES if route in args.routes]:
+        if args.warmup:
+            run_route(app, workload, route, args.concurrency, args.warmup, counter)
+        results[route] = run_route(app, workload, route, args.concurrency, args.requests, counter)
+
+    backend_name = "mongomock" if args.mongomock else "mongodb"
+    label = f"{backend_name}-{args.students}x{args.subjects}x{args.days}-c{args.concurrency}"
+    print(f"{label} requests={args.requests} cache={'on' if args.cache else 'off'}")
+    print_results(results)
+
+    status = 0
+    baselines = load_baselines()
+    if args.check:
+        if label not in baselines:
+            print(f"❌ No baseline stored for {label} (run with --save first)")
+            return 1
+        failures = check_baseline(results, baselines[label], args.latency_tolerance)
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print(f"✅ Within baseline for {label}")
+        status = 1 if failures else 0
+    if args.save:
+        baselines[label] = {**baselines.get(label, {}), **results}
+        BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"✅ Baseline saved for {label}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Time-bucketed attendance storage: one document per (student, subject, month).
+
+Selected with ``ATTENDANCE_SCHEMA=bucketed``. Instead of one document per
+mark in ``attendance``, marks live in ``attendance_buckets``::
+
+    {"student": "S001", "subject": "DBMS", "month": "2024-03",
+     "days": {"04": {"status": "Present", "marked_by": "F001"}, ...}}
+
+Marking a session is a ``$set`` of ``days.<DD>`` on the month's bucket
+(upserted), so a student with 6 subjects over 4 years has under 300 documents
+and the unique ``student_subject_month_unique`` index a matching number of
+keys.
+
+Reads go through ``attendance_marks``, a read-only view that unwinds the
+buckets back into flat mark documents (``student, date, subject, status,
+marked_by``), so every route and pipeline written against ``attendance`` runs
+unchanged against it. MongoDB moves ``student`` / ``subject`` filters ahead of
+the unwind, so a per-student read fetches only that student's buckets.
+
+``migrate`` copies the flat collection into buckets (see ``manage.py
+migrate-buckets``). The write path lives in marks.py next to the flat one.
+"""
+from collections import defaultdict
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import CollectionInvalid
+
+BUCKETS = "attendance_buckets"
+VIEW = "attendance_marks"
+BUCKET_KEY = ("student", "subject", "month")
+DATE_PATTERN = r"^[0-9]{4}-[0-9]{2}-[0-9]{2}$"
+
+INDEXES = [
+    ([("student", ASCENDING), ("subject", ASCENDING), ("month", ASCENDING)],
+     {"name": "student_subject_month_unique", "unique": True}),
+    ([("subject", ASCENDING), ("month", ASCENDING)], {"name": "subject_month"}),
+]
+
+# Buckets -> flat mark documents (the ``attendance_marks`` view definition)
+FLATTEN = [
+    {"$project": {"_id": 0, "student": 1, "subject": 1, "month": 1, "days": {"$objectToArray": "$days"}}},
+    {"$unwind": "$days"},
+    {"$project": {
+        "student": 1,
+        "subject": 1,
+        "date": {"$concat": ["$month", "-", "$days.k"]},
+        "status": "$days.v.status",
+        "marked_by": "$days.v.marked_by",
+    }},
+]
+
+
+def split_date(day):
+    """``"YYYY-MM-DD"`` -> ``("YYYY-MM", "DD")``; raises ValueError for anything else."""
+    if not isinstance(day, str) or len(day) != 10 or day[4] != "-" or day[7] != "-" \
+            or not (day[:4] + day[5:7] + day[8:]).isdigit():
+        raise ValueError(f"invalid date {day!r}")
+    return day[:7], day[8:]
+
+
+def bucket_filter(mark):
+    month, _ = split_date(mark["date"])
+    return {"student": mark["student"], "subject": mark["subject"], "month": month}
+
+
+def upsert_op(mark):
+    """``UpdateOne`` setting the mark's day in its month bucket (creating the bucket if needed)."""
+    _, day = split_date(mark["date"])
+    values = {field: value for field, value in mark.items() if field not in ("student", "date", "subject")}
+    return UpdateOne(bucket_filter(mark), {"$set": {f"days.{day}": values}}, upsert=True)
+
+
+def status_query(marks):
+    """``(filter, projection)`` fetching the buckets, and only the days, that ``marks`` touch."""
+    buckets = defaultdict(set)
+    for mark in marks:
+        month, day = split_date(mark["date"])
+        buckets[(mark["student"], mark["subject"], month)].add(day)
+    query = {"$or": [
+        {"student": student, "subject": subject, "month": month}
+        for student, subject, month in buckets
+    ]}
+    days = sorted({day for bucket_days in buckets.values() for day in bucket_days})
+    projection = {"_id": 0, "student": 1, "subject": 1, "month": 1, **{f"days.{day}.status": 1 for day in days}}
+    return query, projection
+
+
+def stored_statuses(bucket):
+    """Yield ``((student, date, subject), status)`` for every day in a bucket document."""
+    for day, value in (bucket.get("days") or {}).items():
+        yield (bucket["student"], f"{bucket['month']}-{day}", bucket["subject"]), value.get("status")
+
+
+def new_sessions(keys, previous, errors):
+    """Indexes of the marks that created a session: the first write of a key not stored before."""
+    seen = set(previous)
+    inserted = set()
+    for index, key in enumerate(keys):
+        if index in errors or key in seen:
+            continue
+        seen.add(key)
+        inserted.add(index)
+    return inserted
+
+
+def delete_update(query):
+    """``(filter, update, projection)`` removing the day matched by a ``{student, date[, subject]}`` query."""
+    month, day = split_date(query["date"])
+    field = f"days.{day}"
+    bucket = {"student": query["student"], "month": month, field: {"$exists": True}}
+    if "subject" in query:
+        bucket["subject"] = query["subject"]
+    return bucket, {"$unset": {field: ""}}, {"_id": 0, "student": 1, "subject": 1, field: 1}
+
+
+def deleted_mark(bucket, date):
+    """Flat ``{student, subject, status}`` of the day removed from ``bucket`` (its pre-image)."""
+    _, day = split_date(date)
+    return {"student": bucket["student"], "subject": bucket["subject"], "status": bucket["days"][day].get("status")}
+
+
+def ensure_view(db):
+    """Create the ``attendance_marks`` view, or bring its definition up to date."""
+    try:
+        db.create_collection(VIEW, viewOn=BUCKETS, pipeline=FLATTEN)
+    except CollectionInvalid:
+        db.command("collMod", VIEW, viewOn=BUCKETS, pipeline=FLATTEN)
+
+
+def migrate(db):
+    """Copy every flat ``attendance`` mark into buckets; returns ``{"marks", "skipped", "buckets"}`` counts.
+
+    Runs server-side (``$group`` + ``$merge``, which needs the
+    ``student_subject_month_unique`` index) and can be re-run: a day already
+    in a bucket (e.g. marked since the switch) wins over the flat copy. Marks
+    whose date is not ``YYYY-MM-DD`` are skipped.
+    """
+    db.attendance.aggregate([
+        {"$match": {"date": {"$regex": DATE_PATTERN}}},
+        {"$group": {
+            "_id": {
+                "student": "$student",
+                "subject": {"$ifNull": ["$subject", "Unknown"]},
+                "month": {"$substrBytes": ["$date", 0, 7]},
+            },
+            "days": {"$push": {
+                "k": {"$substrBytes": ["$date", 8, 2]},
+                "v": {"status": "$status", "marked_by": "$marked_by"},
+            }},
+        }},
+        {"$project": {
+            "_id": 0,
+            "student": "$_id.student",
+            "subject": "$_id.subject",
+            "month": "$_id.month",
+            "days": {"$arrayToObject": "$days"},
+        }},
+        {"$merge": {
+            "into": BUCKETS,
+            "on": list(BUCKET_KEY),
+            "whenMatched": [{"$set": {"days": {"$mergeObjects": ["$$new.days", "$days"]}}}],
+            "whenNotMatched": "insert",
+        }},
+    ], allowDiskUse=True)
+    return {
+        "marks": db.attendance.count_documents({"date": {"$regex": DATE_PATTERN}}),
+        "skipped": db.attendance.count_documents({"date": {"$not": {"$regex": DATE_PATTERN}}}),
+        "buckets": db[BUCKETS].count_documents({}),
+    }
+
+
+def storage_report(db, names):
+    """``{name: {"documents", "storage_bytes", "index_bytes"}}`` from ``collStats``."""
+    report = {}
+    for name in names:
+        stats = db.command("collStats", name)
+        report[name] = {
+            "documents": stats.get("count", 0),
+            "storage_bytes": stats.get("storageSize", 0),
+            "index_bytes": stats.get("totalIndexSize", 0),
+        }
+    return report
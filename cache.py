@@ -0,0 +1,90 @@
+"""In-process LRU cache with a TTL, used for the hot read endpoints.
+
+Entries carry tags (e.g. ``("student", "RBT23CB001")``) so a write can drop
+exactly the responses it affects. The cache is per process: with several
+workers, another worker's copy stays valid until its TTL runs out.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ``ttl`` seconds after being stored."""
+
+    def __init__(self, maxsize=1024, ttl=30.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tagged = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        # Bumped by every invalidation; see ``set(generation=...)``
+        self.generation = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, tags=(), generation=None):
+        """Store ``value``. When ``generation`` (read before building the value) is given and
+        an invalidation has happened since, the value may be stale and is not stored."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self.clock() + self.ttl, value, tuple(tags))
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of ``tags``; returns how many were removed."""
+        with self._lock:
+            keys = set().union(*(self._tagged.get(tag, ()) for tag in tags))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            self.generation += 1
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
@@ -0,0 +1,120 @@
+"""Backend API client for the Streamlit dashboards.
+
+All calls share one pooled keep-alive ``requests.Session``. Reads are wrapped
+in ``st.cache_data`` so a page interaction fetches each dataset at most once;
+the write helpers clear those caches so the next read sees the change.
+Cached readers raise ``requests.RequestException`` on failure (errors are not
+cached).
+"""
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import API_URL, CLIENT_CACHE_TTL_SECONDS, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+
+@st.cache_resource
+def get_session():
+    """One connection pool per Streamlit server process, reused across reruns and users."""
+    session = requests.Session()
+    # Only idempotent GETs are retried
+    retries = Retry(total=2, backoff_factor=0.2, allowed_methods=["GET"], status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get(path, params=None):
+    return get_session().get(f"{API_URL}{path}", params=params, timeout=TIMEOUT)
+
+
+def post(path, payload):
+    # The session token from /login authorises writes
+    token = st.session_state.get("token")
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+    return get_session().post(f"{API_URL}{path}", json=payload, headers=headers, timeout=TIMEOUT)
+
+
+def get_json(path, params=None):
+    response = get(path, params)
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(ttl=CLIENT_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_students():
+    return get_json("/get_students")
+
+
+@st.cache_data(ttl=CLIENT_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_subjects():
+    return get_json("/subjects")["subjects"]
+
+
+@st.cache_data(ttl=CLIENT_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_summary(student):
+    return get_json(f"/attendance_summary/{student}")
+
+
+@st.cache_data(ttl=CLIENT_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_roster(subject=None, fresh=False):
+    """``(rows, generated_at)``: ``generated_at`` is set when the server answered from a report snapshot."""
+    response = get("/get_all_attendance", {"subject": subject, "fresh": "true" if fresh else None})
+    response.raise_for_status()
+    return response.json(), response.headers.get("X-Snapshot-Generated-At")
+
+
+@st.cache_data(ttl=CLIENT_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_calendar(student, subject=None):
+    return get_json(f"/calendar/{student}", {"subject": subject})
+
+
+@st.cache_data(ttl=CLIENT_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_trends(student, period="week"):
+    return get_json(f"/trends/{student}", {"period": period})
+
+
+@st.cache_data(ttl=CLIENT_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_subject_trends(subject, period="week"):
+    return get_json(f"/trends/subject/{subject}", {"period": period})
+
+
+@st.cache_data(ttl=CLIENT_CACHE_TTL_SECONDS, show_spinner=False)
+def fetch_defaulters(threshold, subjects=()):
+    return get_json("/defaulters", {"threshold": threshold, "subjects": ",".join(subjects)})
+
+
+def invalidate_attendance():
+    """Forget cached attendance reads after this dashboard changed something."""
+    fetch_summary.clear()
+    fetch_calendar.clear()
+    fetch_roster.clear()
+    fetch_trends.clear()
+    fetch_subject_trends.clear()
+    fetch_defaulters.clear()
+
+
+def login(username, password):
+    return post("/login", {"username": username, "password": password})
+
+
+def mark_attendance(payload):
+    response = post("/mark_attendance", payload)
+    invalidate_attendance()
+    return response
+
+
+def mark_class(payload):
+    response = post("/mark_attendance/bulk", payload)
+    invalidate_attendance()
+    return response
+
+
+def delete_attendance(payload):
+    response = post("/delete_attendance", payload)
+    invalidate_attendance()
+    return response
@@ -0,0 +1,97 @@
+"""Shared settings for the Attender backend, dashboards and maintenance commands.
+
+Values can be overridden with environment variables of the same name.
+"""
+import os
+
+# ✅ MongoDB connection string (database name is part of the URI)
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/attendance_db")
+
+# ✅ Faculty-subject registry (subjects live on the faculty user documents, see faculty.py)
+# Poll interval when MongoDB has no change streams; also bounds how long a change stream waits
+FACULTY_REFRESH_SECONDS = float(os.environ.get("FACULTY_REFRESH_SECONDS", 30))
+
+# ✅ Sessions and passwords (see auth.py)
+# Set SECRET_KEY in production: every worker must share it, and a random key logs everyone out on restart
+# (gunicorn.conf.py refuses to start more than one worker without it)
+SECRET_KEY = os.environ.get("SECRET_KEY") or os.urandom(32).hex()
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", 12 * 60 * 60))
+# werkzeug method string; raise the cost parameters as hardware allows
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+
+# ✅ Read cache for /get_students, /get_attendance, /attendance_summary and /get_all_attendance
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", 30))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+# Streamed responses larger than this are served but not cached
+CACHE_MAX_ENTRY_BYTES = int(os.environ.get("CACHE_MAX_ENTRY_BYTES", 1_000_000))
+
+# ✅ Streamlit dashboards: backend address, HTTP timeouts and client-side cache
+API_URL = os.environ.get("API_URL", "http://127.0.0.1:5000")
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 30))
+CLIENT_CACHE_TTL_SECONDS = int(os.environ.get("CLIENT_CACHE_TTL_SECONDS", 30))
+
+# ✅ Minimum attendance % before a student is listed as a defaulter
+DEFAULTER_THRESHOLD = float(os.environ.get("DEFAULTER_THRESHOLD", 75))
+
+# ✅ MongoDB connection pool, per process: a deployment opens up to WEB_WORKERS × MONGO_MAX_POOL_SIZE connections
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", 0)) or None  # 0 = keep idle connections
+# Give up instead of hanging a worker thread when MongoDB is unreachable or the pool is exhausted
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", 0)) or None  # 0 = no limit
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", 0)) or None  # 0 = wait for a connection
+# primary | primaryPreferred | secondary | secondaryPreferred | nearest (secondaries may lag behind fresh marks)
+MONGO_READ_PREFERENCE = os.environ.get("MONGO_READ_PREFERENCE", "primary")
+
+# Keyword arguments for every long-lived client of the API processes (PyMongo, Motor)
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": MONGO_MAX_POOL_SIZE,
+    "minPoolSize": MONGO_MIN_POOL_SIZE,
+    "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+    "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+    "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+    "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    "readPreference": MONGO_READ_PREFERENCE,
+    "appname": "attender",
+}
+
+# ✅ Write-behind marking: acknowledge marks once validated, write them in batches
+WRITE_BEHIND = os.environ.get("WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", 500))
+WRITE_BEHIND_INTERVAL_MS = float(os.environ.get("WRITE_BEHIND_INTERVAL_MS", 50))
+WRITE_BEHIND_QUEUE_SIZE = int(os.environ.get("WRITE_BEHIND_QUEUE_SIZE", 10000))
+# buffered | flushed | journaled (see write_behind.py)
+WRITE_BEHIND_DURABILITY = os.environ.get("WRITE_BEHIND_DURABILITY", "buffered")
+
+# ✅ Request metrics on /metrics; MongoDB commands slower than this are logged
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+
+# ✅ Rows per Arrow record batch / Parquet row group on /export/attendance
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 50_000))
+
+# ✅ In-memory attendance matrix for /analytics/* (needs numpy), off by default: every worker process
+# holds its own copy and re-reads all marks every ANALYTICS_RELOAD_SECONDS to see other workers' writes
+ANALYTICS_MATRIX = os.environ.get("ANALYTICS_MATRIX", "0") == "1"
+ANALYTICS_RELOAD_SECONDS = float(os.environ.get("ANALYTICS_RELOAD_SECONDS", 300))
+
+# ✅ Attendance storage: "flat" (one document per mark) or "bucketed" (one per student, subject and month,
+# see buckets.py); switch after `python manage.py migrate-buckets`
+ATTENDANCE_SCHEMA = os.environ.get("ATTENDANCE_SCHEMA", "flat")
+
+# ✅ Report snapshots (see snapshots.py): served while younger than SNAPSHOT_MAX_AGE_SECONDS, unless ?fresh=true;
+# refreshed by `python manage.py snapshot-reports` (cron) or in-process every SNAPSHOT_INTERVAL_SECONDS (0 = off;
+# with several workers only the one holding the snapshot lease runs it)
+SNAPSHOT_MAX_AGE_SECONDS = float(os.environ.get("SNAPSHOT_MAX_AGE_SECONDS", 26 * 3600))
+SNAPSHOT_INTERVAL_SECONDS = float(os.environ.get("SNAPSHOT_INTERVAL_SECONDS", 0))
+
+# ✅ Production server (gunicorn.conf.py / wsgi.py): worker processes × threads per worker
+WEB_BIND = os.environ.get("WEB_BIND", "127.0.0.1:5000")
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", 2 * (os.cpu_count() or 1) + 1))
+WEB_THREADS = int(os.environ.get("WEB_THREADS", 4))
+WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", 30))
+# `python main.py` runs the development server; FLASK_DEBUG=1 turns on the debugger and reloader
+DEBUG = os.environ.get("FLASK_DEBUG", "0") == "1"
@@ -0,0 +1,96 @@
+"""In-memory faculty → subjects registry for the mark endpoints.
+
+Subjects live on the faculty user documents (``users.subjects``, a list, so
+one faculty can teach several subjects). The registry reads them once at
+startup and reloads whenever the ``users`` collection changes, so the
+write path resolves a faculty's subject without touching MongoDB.
+
+Changes are picked up from a change stream when the server supports one
+(replica set / Atlas) and by polling every ``FACULTY_REFRESH_SECONDS``
+otherwise.
+"""
+import threading
+
+from pymongo.errors import PyMongoError
+
+FACULTY_QUERY = {"role": "faculty"}
+FACULTY_PROJECTION = {"_id": 0, "username": 1, "subjects": 1}
+
+
+class FacultyRegistry:
+    def __init__(self, users):
+        self.users = users
+        self._subjects = {}  # username -> tuple of subjects, replaced wholesale on reload
+        self._stop = threading.Event()
+        self._thread = None
+        self.mode = None  # "change_stream" or "poll" once watching
+
+    def load(self):
+        """Re-read every faculty's subjects. Returns the number of faculty loaded."""
+        self._subjects = {
+            faculty["username"]: tuple(faculty.get("subjects") or ())
+            for faculty in self.users.find(FACULTY_QUERY, FACULTY_PROJECTION)
+        }
+        return len(self._subjects)
+
+    def subjects_for(self, username):
+        """Subjects taught by ``username`` (None if they are not a faculty user)."""
+        return self._subjects.get(username)
+
+    def all_subjects(self):
+        return sorted({subject for subjects in self._subjects.values() for subject in subjects})
+
+    def as_dict(self):
+        return {username: list(subjects) for username, subjects in sorted(self._subjects.items())}
+
+    def resolve(self, username, subject=None):
+        """Pick the subject a mark from ``username`` is recorded under.
+
+        Returns ``(subject, error)``; ``error`` is ``(message, status)`` when the
+        faculty is unknown, teaches nothing, did not name one of several
+        subjects, or named a subject they do not teach.
+        """
+        subjects = self.subjects_for(username)
+        if subjects is None:
+            return None, ("Invalid Faculty", 403)
+        if not subjects:
+            return None, ("No subject assigned to this faculty", 403)
+        if subject is None:
+            if len(subjects) > 1:
+                return None, (f"subject is required, one of: {', '.join(subjects)}", 400)
+            return subjects[0], None
+        if subject not in subjects:
+            return None, (f"{username} does not teach {subject}", 403)
+        return subject, None
+
+    def watch(self, interval):
+        """Keep the registry current from a background thread (see module docstring)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="faculty-registry", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+
+    def _run(self, interval):
+        try:
+            self._follow_changes(interval)
+        except PyMongoError:
+            pass  # standalone servers have no change streams
+        self.mode = "poll"
+        while not self._stop.wait(interval):
+            self._reload()
+
+    def _follow_changes(self, interval):
+        with self.users.watch(max_await_time_ms=int(interval * 1000)) as stream:
+            self.mode = "change_stream"
+            self._reload()  # cover changes made before the stream opened
+            while not self._stop.is_set():
+                if stream.try_next() is not None:
+                    self._reload()
+
+    def _reload(self):
+        try:
+            self.load()
+        except PyMongoError as e:
+            print(f"❌ Faculty registry reload failed: {e}")
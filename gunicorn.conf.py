@@ -0,0 +1,35 @@
+"""gunicorn settings for the Flask API: ``gunicorn -c gunicorn.conf.py``.
+
+Sizes come from config.py (WEB_BIND, WEB_WORKERS, WEB_THREADS, WEB_TIMEOUT).
+Each worker is a separate process with its own MongoDB pool, read cache,
+faculty registry and analytics matrix. Keep WEB_WORKERS × MONGO_MAX_POOL_SIZE
+within what the MongoDB server accepts; a worker rarely needs more pooled
+connections than WEB_THREADS plus its background threads.
+"""
+import os
+import sys
+
+from config import WEB_BIND, WEB_THREADS, WEB_TIMEOUT, WEB_WORKERS
+
+wsgi_app = "wsgi:create_app()"
+bind = WEB_BIND
+workers = WEB_WORKERS
+threads = WEB_THREADS
+worker_class = "gthread" if WEB_THREADS > 1 else "sync"
+timeout = WEB_TIMEOUT
+graceful_timeout = WEB_TIMEOUT  # time for the write-behind queue to drain on shutdown
+keepalive = 5
+
+# MongoClient is not fork-safe: build the app in each worker, never in the master (see wsgi.py)
+preload_app = False
+
+
+def on_starting(server):
+    # config.py falls back to a random SECRET_KEY per process: each worker would reject the others' tokens
+    if server.cfg.workers > 1 and not os.environ.get("SECRET_KEY"):
+        sys.exit(f"❌ SECRET_KEY is not set: the {server.cfg.workers} workers would each sign sessions with their own key")
+
+
+def post_fork(server, worker):
+    if "main" in sys.modules:
+        server.log.warning("main.py was imported before fork: worker %s shares the master's MongoDB client", worker.pid)
@@ -0,0 +1,157 @@
+"""Streaming CSV import of historical attendance.
+
+The file is read row by row (``student,date,subject,status[,marked_by]``),
+validated against the known students and subjects, and written in chunks
+with ``marks.write_marks`` (unordered ``bulk_write`` upserts plus counter
+updates), so memory stays flat whatever the file size. Re-importing a row is
+harmless: the upsert key is (student, date, subject).
+
+Chunks are written by ``workers`` threads. Rows are partitioned by student, and
+each partition has at most one chunk in flight, so two writes for the same
+session never race and the ``attendance_stats`` counters stay exact.
+
+``import_csv`` reports progress through callbacks: ``checkpoint(line)`` is
+called with the last line number below which every row has been written or
+rejected, so an interrupted import resumes with ``start_line=line``.
+"""
+import csv
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from marks import write_marks
+from pipelines import parse_date
+
+REQUIRED_COLUMNS = ("student", "date", "subject", "status")
+STATUSES = {"present": "Present", "absent": "Absent"}
+
+
+def known_students(db):
+    return set(db.users.distinct("username", {"role": "student"}))
+
+
+def known_subjects(db):
+    return set(db.users.distinct("subjects", {"role": "faculty"}))
+
+
+def read_rows(stream):
+    """Yield ``(line_number, row dict)`` from a CSV text stream with a header row."""
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    for row in reader:
+        yield reader.line_num, row
+
+
+def validate(row, students, subjects, default_marked_by):
+    """Turn a CSV row into a mark; returns ``(mark, None)`` or ``(None, reason)``."""
+    student = (row.get("student") or "").strip()
+    subject = (row.get("subject") or "").strip()
+    if student not in students:
+        return None, "unknown student"
+    if subject not in subjects:
+        return None, "unknown subject"
+    try:
+        day = parse_date((row.get("date") or "").strip())
+    except ValueError:
+        day = None
+    if not day:
+        return None, "invalid date"
+    status = STATUSES.get((row.get("status") or "").strip().lower())
+    if status is None:
+        return None, "invalid status"
+    return {
+        "student": student,
+        "date": day,
+        "subject": subject,
+        "status": status,
+        "marked_by": (row.get("marked_by") or "").strip() or default_marked_by,
+    }, None
+
+
+def import_csv(db, stream, students, subjects, chunk_size=5000, workers=4, start_line=0,
+               default_marked_by="import", checkpoint=None, progress=None, reject=None, progress_every=5.0):
+    """Import attendance from a CSV text stream; returns a report dict.
+
+    Rows on lines up to ``start_line`` are skipped. ``reject(line, row, reason)``
+    receives invalid rows and rows MongoDB refused; ``progress(report)`` is
+    called about every ``progress_every`` seconds.
+    """
+    report = {"read": 0, "skipped": 0, "written": 0, "rejected": 0, "reasons": {}, "last_line": start_line}
+    started = time.perf_counter()
+    buffers = [[] for _ in range(workers)]  # per partition: [(line, mark), ...]
+    pending = [None] * workers  # per partition: future of the chunk being written
+    last_report = started
+
+    def refuse(line, row, reason):
+        report["rejected"] += 1
+        report["reasons"][reason] = report["reasons"].get(reason, 0) + 1
+        if reject:
+            reject(line, row, reason)
+
+    def write(chunk):
+        return chunk, write_marks(db, [mark for _, mark in chunk], ordered=False)
+
+    def settle(partition):
+        """Wait for the partition's chunk in flight and account for it."""
+        future, pending[partition] = pending[partition], None
+        if future is None:
+            return
+        chunk, errors = future.result()
+        for (line, mark), error in zip(chunk, errors):
+            if error:
+                refuse(line, mark, error)
+            else:
+                report["written"] += 1
+
+    def committed_line(read_up_to):
+        """Highest line such that every row at or before it is settled."""
+        open_lines = [chunk[0][0] for chunk in buffers if chunk]
+        open_lines += [future.chunk_start for future in pending if future is not None]
+        return min(open_lines) - 1 if open_lines else read_up_to
+
+    def flush(partition):
+        settle(partition)
+        chunk, buffers[partition] = buffers[partition], []
+        future = pool.submit(write, chunk)
+        future.chunk_start = chunk[0][0]
+        pending[partition] = future
+
+    line = start_line
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import") as pool:
+        for line, row in read_rows(stream):
+            if line <= start_line:
+                report["skipped"] += 1
+                continue
+            report["read"] += 1
+            mark, reason = validate(row, students, subjects, default_marked_by)
+            if reason:
+                refuse(line, row, reason)
+                continue
+            partition = zlib.crc32(mark["student"].encode()) % workers
+            buffers[partition].append((line, mark))
+            if len(buffers[partition]) >= chunk_size:
+                flush(partition)
+                if checkpoint:
+                    checkpoint(committed_line(line))
+
+            now = time.perf_counter()
+            if progress and now - last_report >= progress_every:
+                last_report = now
+                progress(summarise(report, now - started))
+
+        for partition in range(workers):
+            if buffers[partition]:
+                flush(partition)
+        for partition in range(workers):
+            settle(partition)
+
+    report["last_line"] = line
+    if checkpoint:
+        checkpoint(line)
+    return summarise(report, time.perf_counter() - started)
+
+
+def summarise(report, seconds):
+    return {**report, "seconds": round(seconds, 2), "rows_per_second": round(report["read"] / seconds) if seconds else 0}
@@ -0,0 +1,191 @@
+"""Index set for the Attender collections.
+
+Every query issued by the API routes is listed here next to the index that
+serves it, so a new query shape should come with a new entry, and with one in
+``endpoint_queries`` so ``manage.py explain`` and the tests check its plan.
+Whole-institution reports (``/defaulters`` without subjects, with or without
+a date window, and ``/export/attendance`` without student or subject) read
+every counter or mark and scan by design:
+
+users
+    ``username_unique``       login
+    ``role_username``         get_students, get_all_attendance roster,
+                              faculty registry load
+attendance
+    ``student_date_subject_unique``
+                              one document per class session (mark_attendance
+                              upserts on it), get_attendance/<student>,
+                              delete_attendance, $lookup in get_all_attendance,
+                              calendar/<student>, trends/<student>
+    ``subject_date``          subject / date-range filtered reports,
+                              trends/subject/<subject>
+    ``marked_by_date``        per-faculty history
+attendance_buckets (ATTENDANCE_SCHEMA=bucketed, see buckets.py)
+    ``student_subject_month_unique``
+                              one document per student, subject and month
+                              (marks $set their day on it), per-student reads
+                              through the attendance_marks view, migrate-buckets
+    ``subject_month``         subject filtered reports
+attendance_stats
+    ``student_subject_unique`` one counter document per (student, subject),
+                              roster and summary reads, snapshot runs
+    ``subject_student``       /defaulters limited to some subjects
+    ``updated_at``            counters changed since the last report snapshot
+report_snapshots
+    ``report_key_version_unique``
+                              latest snapshot of a report (see snapshots.py)
+"""
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+import buckets
+import snapshots
+from config import DEFAULTER_THRESHOLD
+from faculty import FACULTY_PROJECTION, FACULTY_QUERY
+from marks import BUCKETED
+from pipelines import attendance_filter, calendar_pipeline, defaulters_pipeline, roster_pipeline
+
+INDEXES = {
+    "users": [
+        ([("username", ASCENDING)], {"name": "username_unique", "unique": True}),
+        ([("role", ASCENDING), ("username", ASCENDING)], {"name": "role_username"}),
+    ],
+    "attendance": [
+        ([("student", ASCENDING), ("date", ASCENDING), ("subject", ASCENDING)],
+         {"name": "student_date_subject_unique", "unique": True}),
+        ([("subject", ASCENDING), ("date", ASCENDING)], {"name": "subject_date"}),
+        ([("marked_by", ASCENDING), ("date", ASCENDING)], {"name": "marked_by_date"}),
+    ],
+    "attendance_buckets": buckets.INDEXES,
+    "attendance_stats": [
+        ([("student", ASCENDING), ("subject", ASCENDING)], {"name": "student_subject_unique", "unique": True}),
+        ([("subject", ASCENDING), ("student", ASCENDING)], {"name": "subject_student"}),
+        ([("updated_at", ASCENDING)], {"name": "updated_at"}),
+    ],
+    "report_snapshots": snapshots.INDEXES,
+}
+
+# Indexes superseded by an entry above: {collection: {old name: replacement name}}
+RETIRED_INDEXES = {
+    "attendance": {"student_date_subject": "student_date_subject_unique"},
+}
+
+
+def ensure_indexes(db):
+    """Create any missing index from ``INDEXES`` and drop retired ones once replaced.
+
+    Returns a report ``{"created": [...], "existing": [...], "dropped": [...],
+    "failed": [(name, error), ...]}`` with names in ``collection.index`` form.
+    A failure (e.g. duplicate marks blocking a unique index) is reported instead
+    of raised so startup continues. With the bucketed schema the
+    ``attendance_marks`` view is created here too.
+    """
+    report = {"created": [], "existing": [], "dropped": [], "failed": []}
+    for collection, specs in INDEXES.items():
+        existing = db[collection].index_information()
+        for keys, options in specs:
+            name = f"{collection}.{options['name']}"
+            if options["name"] in existing:
+                report["existing"].append(name)
+                continue
+            try:
+                db[collection].create_index(keys, **options)
+                report["created"].append(name)
+            except OperationFailure as e:
+                report["failed"].append((name, str(e)))
+
+    for collection, retired in RETIRED_INDEXES.items():
+        existing = db[collection].index_information()
+        for old_name, replacement in retired.items():
+            if old_name in existing and replacement in existing:
+                db[collection].drop_index(old_name)
+                report["dropped"].append(f"{collection}.{old_name}")
+
+    if BUCKETED:
+        buckets.ensure_view(db)
+    return report
+
+
+def print_index_report(report):
+    for name in report["created"]:
+        print(f"✅ Index created: {name}")
+    for name in report["dropped"]:
+        print(f"✅ Index dropped: {name}")
+    for name, error in report["failed"]:
+        print(f"⚠ Index not created: {name} ({error})")
+    if any(name == "attendance.student_date_subject_unique" for name, _ in report["failed"]):
+        print("⚠ Duplicate attendance marks found - run `python manage.py dedup` to collapse them")
+    print(f"✅ Indexes ready: {len(report['created']) + len(report['existing'])}, failed: {len(report['failed'])}")
+
+
+def plan_stages(plan):
+    """Collect every ``stage`` name (IXSCAN, COLLSCAN, FETCH, ...) from an explain document."""
+    stages = []
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(plan_stages(value))
+    return stages
+
+
+def explain_pipeline(db, collection, pipeline):
+    return db.command("explain", {"aggregate": collection, "pipeline": pipeline, "cursor": {}}, verbosity="queryPlanner")
+
+
+def endpoint_queries(db, student="RBT23CB001", subject="DBMS", day="2025-01-01"):
+    """The query each endpoint runs, as ``(endpoint, explain document)`` pairs.
+
+    Aggregations that need MongoDB 5.0 (``$setWindowFields``) are explained by
+    their leading ``$match``, which is what picks the index.
+    """
+    users, attendance = db.users, db.attendance
+    yield "/login", users.find({"username": student}, {"_id": 0}).explain()
+    yield "faculty registry", users.find(FACULTY_QUERY, FACULTY_PROJECTION).explain()
+    yield "/get_attendance/<student>", attendance.find({"student": student}, {"_id": 0}).explain()
+    yield "/get_students", users.find({"role": "student"}, {"_id": 0, "username": 1}).explain()
+    yield "/get_all_attendance", explain_pipeline(db, "users", roster_pipeline())
+    yield "/get_all_attendance ($lookup)", db.attendance_stats.find({"student": student}).explain()
+    yield "/attendance_summary/<student>", db.attendance_stats.find({"student": student}).explain()
+    yield "/delete_attendance", attendance.find({"student": student, "date": day, "subject": subject}).limit(1).explain()
+    yield "/calendar/<student>", explain_pipeline(db, "attendance", calendar_pipeline(student))
+    yield "/trends/<student>", attendance.find(attendance_filter(student=student)).explain()
+    yield "/trends/subject/<subject>", attendance.find(attendance_filter(subject=subject)).explain()
+    yield "/defaulters?subjects", db.attendance_stats.find(
+        defaulters_pipeline(DEFAULTER_THRESHOLD, subjects=[subject])[0]["$match"]
+    ).explain()
+
+    # Report snapshots: the route's read, and a run's counter changes and changed-student rows
+    yield "report snapshot", db[snapshots.COLLECTION].find(
+        {"report": snapshots.ROSTER, "key": snapshots.ALL}
+    ).sort("version", DESCENDING).limit(1).explain()
+    yield "snapshot run (changed counters)", db.attendance_stats.find({"updated_at": {"$gt": snapshots.now()}}).explain()
+    yield "snapshot run (defaulter rows)", db.attendance_stats.find(
+        defaulters_pipeline(DEFAULTER_THRESHOLD, students=[student])[0]["$match"]
+    ).explain()
+
+    # Bucketed storage: marking and deleting touch one month bucket, per-student reads go through the view
+    mark = {"student": student, "date": day, "subject": subject}
+    yield "/mark_attendance (bucketed)", db[buckets.BUCKETS].find(*buckets.status_query([mark])).explain()
+    yield "/delete_attendance (bucketed)", db[buckets.BUCKETS].find(buckets.delete_update(mark)[0]).explain()
+    if BUCKETED:
+        yield "/get_attendance/<student> (bucketed)", explain_pipeline(db, buckets.VIEW, [{"$match": {"student": student}}])
+
+
+def check_query_plans(db):
+    """Explain every endpoint query; returns ``[(endpoint, stages, uses_index), ...]``.
+
+    An endpoint passes when its winning plan contains an IXSCAN and no COLLSCAN.
+    """
+    results = []
+    for endpoint, explain in endpoint_queries(db):
+        if "stages" in explain:  # aggregate explain: the plan sits under the $cursor stage
+            stages = plan_stages(explain["stages"])
+        else:
+            stages = plan_stages(explain.get("queryPlanner", {}).get("winningPlan", explain))
+        results.append((endpoint, stages, "IXSCAN" in stages and "COLLSCAN" not in stages))
+    return results
+
@@ -1,159 +1,773 @@
-from flask import Flask, request, jsonify
+import atexit
+import csv
+import hashlib
+import io
+import json
+from functools import wraps
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_pymongo import PyMongo
 from flask_cors import CORS
 
+from auth import AuthError, authenticate, check_password, credential_update, issue_token, public_user
+from cache import TTLCache
+from config import (
+    ANALYTICS_MATRIX, ANALYTICS_RELOAD_SECONDS, CACHE_MAX_ENTRIES, CACHE_MAX_ENTRY_BYTES, CACHE_TTL_SECONDS, DEBUG,
+    DEFAULTER_THRESHOLD, EXPORT_BATCH_SIZE, FACULTY_REFRESH_SECONDS, MONGO_CLIENT_OPTIONS, MONGO_URI, SLOW_QUERY_MS,
+    SNAPSHOT_INTERVAL_SECONDS, SNAPSHOT_MAX_AGE_SECONDS, WRITE_BEHIND, WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_DURABILITY, WRITE_BEHIND_INTERVAL_MS, WRITE_BEHIND_QUEUE_SIZE
+)
+import export
+import matrix
+import snapshots
+from faculty import FacultyRegistry
+from importer import import_csv, known_students
+from indexes import ensure_indexes, print_index_report
+from metrics import CommandTimer, Metrics
+from marks import MARKS_SOURCE, delete_mark, rebuild_stats, write_marks
+from pipelines import (
+    MAX_PAGE_SIZE, TREND_PERIODS, absence_streaks_pipeline, attendance_filter, calendar_pipeline,
+    defaulters_pipeline, encode_cursor, history_query, parse_date, pick_fields, roster_pipeline,
+    stats_summary_pipeline, summary_pipeline, trend_reports, trend_series_pipeline
+)
+from write_behind import QueueFull, WriteBehindQueue
+
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS
+CORS(app, expose_headers=["X-Next-Cursor", "X-Cache"])  # Enable CORS
+
+# ✅ Per-route and per-command metrics for /metrics (the listener must exist before the client)
+metrics = Metrics()
 
 # ✅ Define MongoDB URI
-app.config["MONGO_URI"] = "mongodb://localhost:27017/attendance_db"
-mongo = PyMongo(app)
+app.config["MONGO_URI"] = MONGO_URI
+# Pool size, timeouts and read preference come from config; created per process (see wsgi.py)
+mongo = PyMongo(app, event_listeners=[CommandTimer(metrics, SLOW_QUERY_MS / 1000)], **MONGO_CLIENT_OPTIONS)
 
 db = mongo.db       # database
 users = db.users    # users collection
-attendance = db.attendance  # attendance collection
+attendance = db[MARKS_SOURCE]  # one document per mark: the attendance collection, or the bucket view
+attendance_stats = db.attendance_stats  # present/total counters per (student, subject)
+
+# ✅ Make sure every query below is served by an index
+print_index_report(ensure_indexes(db))
+
+# ✅ Build the counters once for databases that predate attendance_stats
+if attendance_stats.estimated_document_count() == 0 and attendance.estimated_document_count() > 0:
+    print(f"✅ attendance_stats rebuilt: {rebuild_stats(db)} counters")
+
+# ✅ Faculty → subjects, loaded once and kept current in the background
+faculty_registry = FacultyRegistry(users)
+print(f"✅ Faculty registry loaded: {faculty_registry.load()} faculty")
+faculty_registry.watch(FACULTY_REFRESH_SECONDS)
+
+# ✅ Students × subjects × days matrix answering /analytics/* without touching MongoDB
+analytics = None
+if ANALYTICS_MATRIX and matrix.AVAILABLE:
+    analytics = matrix.AttendanceMatrix()
+    try:
+        count = analytics.load(db)
+        print(f"✅ Attendance matrix loaded: {count} marks read ({analytics.stats()['skipped']} malformed, skipped), "
+              f"{analytics.stats()['bytes']} bytes")
+        analytics.refresh_every(db, ANALYTICS_RELOAD_SECONDS)
+    except Exception as e:
+        print(f"❌ Attendance matrix not loaded, /analytics/* disabled: {e}")
+        analytics = None
+
+# ✅ Optional in-process report snapshots (otherwise run `python manage.py snapshot-reports` from cron)
+if SNAPSHOT_INTERVAL_SECONDS > 0:
+    snapshots.run_every(db, SNAPSHOT_INTERVAL_SECONDS, DEFAULTER_THRESHOLD, faculty_registry.all_subjects)
 
 # ✅ Delete existing users & attendance to reset the database
 # users.delete_many({})
 # attendance.delete_many({})
 
-# ✅ Faculty-Subject Mapping
-faculty_subjects = {
-    "Kavita Patil": "DAA",
-    "Kirti Deshpande": "DBMS",
-    "Neeraj Sathawane": "DAV",
-    "Suhasini Bhat": "BCVS",
-    "Raj": "CT",
-    "Kavita Moholkar": "IPR"
-}
-
-# ✅ Default Users
-default_users = [
-    # Faculty Users
-    {"username": "kavitapatil", "password": "pass123", "role": "faculty", "name": "Kavita Patil"},
-    {"username": "kirtideshpande", "password": "pass123", "role": "faculty", "name": "Kirti Deshpande"},
-    {"username": "neerajsathawane", "password": "pass123", "role": "faculty", "name": "Neeraj Sathawane"},
-    {"username": "suhasinibhat", "password": "pass123", "role": "faculty", "name": "Suhasini Bhat"},
-    {"username": "raj", "password": "pass123", "role": "faculty", "name": "Raj"},
-    {"username": "kavitamoholkar", "password": "pass123", "role": "faculty", "name": "Kavita Moholkar"},
-
-    # Student Users with Roll Numbers
-    {"username": "RBT23CB001", "password": "pass123", "role": "student", "name": "Pramay Wankhade"},
-    {"username": "RBT23CB002", "password": "pass123", "role": "student", "name": "Krushnakant Patil"},
-    {"username": "RBT23CB003", "password": "pass123", "role": "student", "name": "Kartik Kurtade"},
-    {"username": "RBT23CB004", "password": "pass123", "role": "student", "name": "Kaustubh Gawade"},
-    {"username": "RBT23CB005", "password": "pass123", "role": "student", "name": "Megh Yashwantkar"}
-]
-
-# ✅ Inserting the default users into the database
-users.insert_many(default_users)
-print("✅ Users inserted successfully!")
+# ✅ Default users are created with `python manage.py seed`, not on import
+
+# ✅ Read cache for the dashboard endpoints, invalidated by mark/delete
+read_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+ALL_SUBJECTS = "*"
+
+
+@app.before_request
+def start_request_metrics():
+    metrics.begin_request(request.url_rule.rule if request.url_rule else "<unmatched>")
+
+
+@app.after_request
+def record_request_metrics(response):
+    stats = metrics.current()
+    metrics.end_request()
+    if stats is None:
+        return response
+    method, status = request.method, response.status_code
+    if not response.is_streamed:
+        metrics.observe_request(stats, method, status, response.calculate_content_length() or 0)
+        return response
+
+    # Streamed bodies are produced after this hook: keep attributing DB work to
+    # the request and record it once the body has been sent
+    def counted(chunks):
+        size = 0
+        metrics.resume_request(stats)
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            metrics.end_request()
+            metrics.observe_request(stats, method, status, size)
+
+    response.response = counted(response.response)
+    return response
+
+
+def json_response(body, cache_status, headers=None):
+    return Response(body, mimetype="application/json", headers={**(headers or {}), "X-Cache": cache_status})
+
+
+def cached_json(tags, build, snapshot=None):
+    """Serve this request's JSON from the read cache, calling ``build()`` for the payload on a miss.
+
+    With ``snapshot=(report, key)`` a miss is answered from that report's
+    current snapshot when there is one, and only built live otherwise.
+    """
+    key = (request.path, request.query_string)
+    cached = read_cache.get(key)
+    if cached is not None:
+        body, headers = cached
+        return json_response(body, "HIT", headers)
+
+    generation = read_cache.generation
+    current = latest_snapshot(*snapshot) if snapshot else None
+    if current is not None:
+        body, headers, status = json.dumps(current["rows"]), snapshot_headers(current), "SNAPSHOT"
+    else:
+        body, headers, status = json.dumps(build()), {}, "MISS"
+    read_cache.set(key, (body, headers), tags, generation=generation)
+    return json_response(body, status, headers)
+
+
+def latest_snapshot(report, key=snapshots.ALL):
+    """The current snapshot of ``report``, or None when the live path should answer (``fresh=true``, none, too old)."""
+    if request.args.get("fresh") == "true":
+        return None
+    snapshot = snapshots.latest(db, report, key)
+    return snapshot if snapshots.is_current(snapshot, SNAPSHOT_MAX_AGE_SECONDS) else None
+
+
+def snapshot_headers(snapshot):
+    return {
+        "X-Snapshot-Version": str(snapshot["version"]),
+        "X-Snapshot-Generated-At": snapshots.aware(snapshot["generated_at"]).isoformat(),
+    }
+
+
+def cache_stream(key, tags, chunks):
+    """Pass a streamed body through, caching it at the end if it stayed under CACHE_MAX_ENTRY_BYTES."""
+    generation = read_cache.generation
+    kept, size = [], 0
+    for chunk in chunks:
+        if kept is not None:
+            kept.append(chunk)
+            size += len(chunk)
+            if size > CACHE_MAX_ENTRY_BYTES:
+                kept = None
+        yield chunk
+    if kept is not None:
+        read_cache.set(key, ("".join(kept), {}), tags, generation=generation)
+
+
+def invalidate_reads(student, subject):
+    """Drop cached reads affected by a change to ``student``'s attendance in ``subject``."""
+    read_cache.invalidate(("student", student), ("roster", subject), ("roster", ALL_SUBJECTS))
+
+
+def invalidate_marks(marks, errors):
+    """Called with every written batch: drop affected cached reads and update the analytics matrix."""
+    written = [mark for mark, error in zip(marks, errors) if not error]
+    for mark in written:
+        invalidate_reads(mark["student"], mark["subject"])
+    if analytics is not None:
+        analytics.apply(written)
+
+
+# ✅ Optional write-behind queue: marks are acknowledged once validated and written in batches
+write_behind = None
+if WRITE_BEHIND:
+    write_behind = WriteBehindQueue(
+        db,
+        batch_size=WRITE_BEHIND_BATCH_SIZE,
+        interval=WRITE_BEHIND_INTERVAL_MS / 1000,
+        maxsize=WRITE_BEHIND_QUEUE_SIZE,
+        durability=WRITE_BEHIND_DURABILITY,
+        on_flush=invalidate_marks,
+    )
+    atexit.register(write_behind.close)  # drain queued marks on shutdown
+    print(f"✅ Write-behind marking enabled ({WRITE_BEHIND_DURABILITY})")
+
+QUEUE_FULL = "Write queue is full, retry shortly"
+
+
+def record_marks(marks, ordered=True):
+    """Write marks now, or hand them to the write-behind queue when it is enabled.
+
+    Returns one error message (``None`` on success) per mark; marks that did not
+    fit in the queue get ``QUEUE_FULL``. Once one mark is rejected the rest of the
+    request is too, without waiting, so a large class cannot hold the worker for
+    ``put_timeout`` per student.
+    """
+    if write_behind is None:
+        errors = write_marks(db, marks, ordered=ordered)
+        invalidate_marks(marks, errors)
+        return errors
+
+    futures = []
+    for mark in marks:
+        try:
+            futures.append(write_behind.submit(mark))
+        except QueueFull:
+            futures.extend([None] * (len(marks) - len(futures)))
+            break
+    if not write_behind.waits_for_flush:
+        return [None if future else QUEUE_FULL for future in futures]
+    return [future.result() if future else QUEUE_FULL for future in futures]
 
 
 @app.route('/login', methods=['POST'])
 def login():
     data = request.json
-    user = users.find_one({"username": data["username"], "password": data["password"]}, {"_id": 0})
-    if user:
-        return jsonify(user), 200
-    return jsonify({"message": "Invalid Credentials"}), 401
+    user = users.find_one({"username": data["username"]}, {"_id": 0})
+    ok, new_hash = check_password(user, data.get("password"))
+    if not ok:
+        return jsonify({"message": "Invalid Credentials"}), 401
+    if new_hash:
+        # ✅ Plaintext or outdated hash: store a fresh one now that we know the password
+        users.update_one({"username": user["username"]}, credential_update(new_hash))
+    return jsonify({**public_user(user), "token": issue_token(user)}), 200
+
+
+def require_role(role):
+    """Reject requests without a valid ``Authorization: Bearer`` token for ``role``; claims go to ``g.user``."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                g.user = authenticate(request.headers.get("Authorization"), role)
+            except AuthError as e:
+                return jsonify({"message": str(e)}), e.status
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def session_faculty(data):
+    """The faculty username from the session token; a ``faculty`` field in the body must agree with it."""
+    faculty = g.user["username"]
+    if data.get("faculty", faculty) != faculty:
+        return None, (jsonify({"message": "faculty does not match the logged-in user"}), 403)
+    return faculty, None
+
+
+def mark_date(data):
+    """The ``date`` of a mark request, normalised to ``YYYY-MM-DD``: ``(date, error_response)``."""
+    try:
+        day = parse_date(data.get("date"))
+    except (TypeError, ValueError):
+        day = None
+    if not day:
+        return None, (jsonify({"message": "date must be a YYYY-MM-DD date"}), 400)
+    return day, None
+
+
+def faculty_subject(faculty, data):
+    """Resolve the subject for a mark request from the registry: ``(subject, error_response)``."""
+    subject, error = faculty_registry.resolve(faculty, data.get("subject"))
+    if error:
+        message, status = error
+        return None, (jsonify({"message": message}), status)
+    return subject, None
 
 
 @app.route('/mark_attendance', methods=['POST'])
+@require_role("faculty")
 def mark_attendance():
     data = request.json
 
-    if "faculty" not in data:  
-        return jsonify({"message": "Unauthorized - Only faculty can mark attendance"}), 403
+    faculty, error = session_faculty(data)
+    if error:
+        return error
 
-    faculty_name = users.find_one({"username": data["faculty"]}, {"_id": 0, "name": 1})
-    
-    if not faculty_name:
-        return jsonify({"message": "Invalid Faculty"}), 403
+    subject, error = faculty_subject(faculty, data)  # ✅ No database lookup on the write path
 
-    faculty_name = faculty_name["name"]
-    subject = faculty_subjects.get(faculty_name, "Unknown")  # Get subject from mapping
+    if error:
+        return error
+
+    day, error = mark_date(data)
+    if error:
+        return error
 
     try:
-        attendance.insert_one({
+        # ✅ Upsert on (student, date, subject) so re-marking updates the same session
+        error, = record_marks([{
             "student": data["student"],
-            "date": data["date"],
+            "date": day,
             "status": data["status"],
-            "marked_by": data["faculty"],
+            "marked_by": faculty,
             "subject": subject  # ✅ Store Subject in Attendance Records
-        })
+        }])
+        if error == QUEUE_FULL:
+            return jsonify({"message": "Server busy", "error": error}), 503, {"Retry-After": "1"}
+        if error:
+            return jsonify({"message": "Failed to update attendance", "error": error}), 500
         return jsonify({"message": "Attendance marked successfully"}), 200
     except Exception as e:
         return jsonify({"message": "Failed to update attendance", "error": str(e)}), 500
 
 
+# ✅ Mark a whole class in one request: {"subject", "date", "records": [{"student", "status"}], "ordered"}
+@app.route('/mark_attendance/bulk', methods=['POST'])
+@require_role("faculty")
+def mark_attendance_bulk():
+    data = request.json
+
+    faculty, error = session_faculty(data)
+    if error:
+        return error
+
+    subject, error = faculty_subject(faculty, data)
+
+    if error:
+        return error
+
+    if not data.get("date") or not isinstance(data.get("records"), list):
+        return jsonify({"message": "date and a list of records are required"}), 400
+
+    day, error = mark_date(data)
+    if error:
+        return error
+
+    results = []
+    marks = []
+    for record in data["records"]:
+        student = record.get("student") if isinstance(record, dict) else None
+        status = record.get("status") if isinstance(record, dict) else None
+        if not student or not status:
+            results.append({"student": student, "ok": False, "error": "student and status are required"})
+            continue
+        results.append({"student": student, "ok": True})
+        marks.append({
+            "student": student,
+            "date": day,
+            "status": status,
+            "marked_by": faculty,
+            "subject": subject
+        })
+
+    try:
+        errors = iter(record_marks(marks, ordered=bool(data.get("ordered", False))))
+    except Exception as e:
+        return jsonify({"message": "Failed to update attendance", "error": str(e)}), 500
+
+    # Attach the write outcome to every record that was sent to MongoDB
+    for result in results:
+        if result["ok"]:
+            error = next(errors)
+            if error:
+                result.update(ok=False, error=error)
+
+    marked = sum(result["ok"] for result in results)
+    body = jsonify({
+        "message": f"Attendance marked for {marked} of {len(results)} students",
+        "marked": marked,
+        "failed": len(results) - marked,
+        "results": results
+    })
+    if any(result.get("error") == QUEUE_FULL for result in results):
+        # Re-sending the whole class is safe: marks upsert on (student, date, subject)
+        return body, 503, {"Retry-After": "1"}
+    return body, 200
+
+
+def date_arg(name):
+    """Read an optional ``YYYY-MM-DD`` query parameter (raises ValueError if malformed)."""
+    return parse_date(request.args.get(name))
+
 
+def stream_json_array(records):
+    """Encode an iterable of documents as a JSON array one record at a time."""
+    yield "["
+    for i, record in enumerate(records):
+        yield ("," if i else "") + json.dumps(record)
+    yield "]"
+
+
+# ✅ Query parameters: limit, after (cursor from X-Next-Cursor), since, until, fields=date,status,...
 @app.route('/get_attendance/<student>', methods=['GET'])
 def get_attendance(student):
     try:
-        records = list(attendance.find({"student": student}, {"_id": 0}))
-        return jsonify(records), 200
+        query, projection, fields, limit = history_query(student, request.args)
+    except ValueError as e:
+        return jsonify({"message": "Invalid query", "error": str(e)}), 400
+
+    key, tags = (request.path, request.query_string), [("student", student)]
+    cached = read_cache.get(key)
+    if cached is not None:
+        body, headers = cached
+        return json_response(body, "HIT", headers)
+
+    try:
+        generation = read_cache.generation
+        records = attendance.find(query, projection).sort([("date", 1), ("subject", 1)])
+
+        if limit is None:
+            # ✅ Full history: stream from the cursor instead of building one big list
+            records = records.batch_size(MAX_PAGE_SIZE)
+            body = stream_json_array(pick_fields(record, fields) for record in records)
+            body = cache_stream(key, tags, body)
+            return Response(stream_with_context(body), mimetype="application/json", headers={"X-Cache": "MISS"})
+
+        page = list(records.limit(limit + 1))
+        headers = {}
+        if len(page) > limit:
+            page = page[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(page[-1])
+        body = json.dumps([pick_fields(record, fields) for record in page])
+        read_cache.set(key, (body, headers), tags, generation=generation)
+        return json_response(body, "MISS", headers)
     except Exception as e:
         return jsonify({"message": "Failed to fetch attendance", "error": str(e)}), 500
 
+
 @app.route('/get_students', methods=['GET'])
 def get_students():
-    try:
+    def build():
         # Fetch only student users from the database
         student_list = list(users.find({"role": "student"}, {"_id": 0, "username": 1}))
 
         # Extract usernames
-        student_usernames = [student["username"] for student in student_list]
+        return [student["username"] for student in student_list]
 
-        return jsonify(student_usernames), 200
+    try:
+        return cached_json([("users",)], build)
     except Exception as e:
         return jsonify({"message": "Failed to fetch students", "error": str(e)}), 500
 
-# Get all student attendance
+
+# Get all student attendance (from the latest report snapshot unless ?fresh=true or a since/until window)
 @app.route('/get_all_attendance', methods=['GET'])
 def get_all_attendance():
     try:
-        # Fetch distinct students
-        student_list = users.find({"role": "student"}, {"_id": 0, "username": 1, "name": 1})
-        
-        attendance_data = []  # Store final data
+        since, until = date_arg("since"), date_arg("until")
+    except ValueError:
+        return jsonify({"error": "since/until must be YYYY-MM-DD dates"}), 400
 
-        unique_students = set()  # ✅ Prevent duplicates
+    try:
+        # ✅ One aggregation for the whole roster instead of 2 queries per student
+        subject = request.args.get("subject")
+        snapshot = None if since or until else (snapshots.ROSTER, subject or snapshots.ALL)
+        pipeline = roster_pipeline(subject=subject, since=since, until=until, marks=MARKS_SOURCE)
+        return cached_json([("roster", subject or ALL_SUBJECTS)], lambda: list(users.aggregate(pipeline)), snapshot)
 
-        for student in student_list:
-            student_id = student["username"]
-            student_name = student["name"]
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-            # ✅ Ensure uniqueness before processing
-            if student_id in unique_students:
-                continue  # Skip duplicate entries
-            unique_students.add(student_id)
 
-            # Count total attendance records for this student
-            total_classes = attendance.count_documents({"student": student_id})
+# ✅ Subject-wise and overall attendance for one student, computed in MongoDB
+@app.route('/attendance_summary/<student>', methods=['GET'])
+def attendance_summary(student):
+    try:
+        since, until = date_arg("since"), date_arg("until")
+    except ValueError:
+        return jsonify({"error": "since/until must be YYYY-MM-DD dates"}), 400
 
-            # Count present days for this student
-            present_days = attendance.count_documents({"student": student_id, "status": "Present"})
+    try:
+        def build():
+            if since or until:
+                result = next(attendance.aggregate(summary_pipeline(student, since=since, until=until)), None)
+            else:
+                # ✅ All-time totals straight from the counters
+                result = next(attendance_stats.aggregate(stats_summary_pipeline(student)), None)
+            if result is None:
+                result = {"subjects": [], "overall": {"present": 0, "total": 0, "percentage": 0}}
+            return {"student": student, **result}
+
+        return cached_json([("student", student)], build)
+    except Exception as e:
+        return jsonify({"message": "Failed to fetch attendance summary", "error": str(e)}), 500
 
-            # Calculate attendance percentage
-            attendance_percentage = (present_days / total_classes) * 100 if total_classes > 0 else 0
 
-            # Append the student data
-            attendance_data.append({
-                "Roll No": student_id,
-                "Name": student_name,
-                "Total Classes": total_classes,
-                "Present Days": present_days,
-                "Attendance %": round(attendance_percentage, 2)
-            })
+# ✅ Per-day status series for the calendar heatmap (optionally ?subject=DBMS)
+# "version" changes whenever the series does, so clients can key rendered images on it
+@app.route('/calendar/<student>', methods=['GET'])
+def calendar(student):
+    subject = request.args.get("subject")
 
-        return jsonify(attendance_data), 200
+    def build():
+        days = list(attendance.aggregate(calendar_pipeline(student, subject=subject)))
+        version = hashlib.sha1(json.dumps(days, sort_keys=True).encode()).hexdigest()[:16]
+        return {"student": student, "subject": subject, "version": version, "days": days}
 
+    try:
+        return cached_json([("student", student)], build)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify({"message": "Failed to fetch calendar", "error": str(e)}), 500
+
+
+def trend_args():
+    """``(period, window, since, until)`` from the query string (raises ValueError)."""
+    period = request.args.get("period", "week")
+    if period not in TREND_PERIODS:
+        raise ValueError("period must be week or month")
+    window = int(request.args.get("window", 4))
+    if not 1 <= window <= 52:
+        raise ValueError("window must be between 1 and 52")
+    return period, window, date_arg("since"), date_arg("until")
+
+
+# ✅ Rolling attendance % per week/month and absence streaks, computed in MongoDB
+# Query parameters: period=week|month, window (periods in the rolling %, default 4), subject, since, until
+@app.route('/trends/<student>', methods=['GET'])
+def student_trends(student):
+    try:
+        period, window, since, until = trend_args()
+    except ValueError as e:
+        return jsonify({"message": "Invalid query", "error": str(e)}), 400
+    subject = request.args.get("subject")
+    match = attendance_filter(student=student, subject=subject, since=since, until=until)
+
+    def build():
+        series = attendance.aggregate(trend_series_pipeline(match, period, window))
+        streaks = attendance.aggregate(absence_streaks_pipeline(match))
+        report = trend_reports(series, streaks, window).get(
+            student, {"series": [], "current_absent": 0, "longest_absent": 0, "rolling_percentage": 0, "change": None}
+        )
+        return {"student": student, "subject": subject, "period": period, "window": window, **report}
+
+    try:
+        return cached_json([("student", student)], build)
+    except Exception as e:
+        return jsonify({"message": "Failed to compute trends", "error": str(e)}), 500
+
+
+# ✅ The same per student for a whole subject cohort, steepest decline first
+@app.route('/trends/subject/<subject>', methods=['GET'])
+def subject_trends(subject):
+    try:
+        period, window, since, until = trend_args()
+    except ValueError as e:
+        return jsonify({"message": "Invalid query", "error": str(e)}), 400
+    match = attendance_filter(subject=subject, since=since, until=until)
+
+    def build():
+        # Two cursors rather than one combined document, which would hit the 16 MB limit on large cohorts
+        series = attendance.aggregate(trend_series_pipeline(match, period, window), allowDiskUse=True)
+        streaks = attendance.aggregate(absence_streaks_pipeline(match), allowDiskUse=True)
+        reports = trend_reports(series, streaks, window)
+        students = [{"student": student, **report} for student, report in reports.items()]
+        # No history long enough for a change sorts last
+        students.sort(key=lambda row: (row["change"] is None, row["change"] or 0, row["student"]))
+        return {"subject": subject, "period": period, "window": window, "students": students}
+
+    try:
+        return cached_json([("roster", subject)], build)
+    except Exception as e:
+        return jsonify({"message": "Failed to compute trends", "error": str(e)}), 500
+
+
+DEFAULTER_CSV_COLUMNS = ["Roll No", "Name", "Present Days", "Total Classes", "Attendance %", "Below Threshold In"]
+
+
+def defaulter_csv_rows(defaulters):
+    """Yield the defaulter list as CSV text, one line at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(DEFAULTER_CSV_COLUMNS)
+    for row in defaulters:
+        writer.writerow([
+            row["student"],
+            row["name"],
+            row["overall"]["present"],
+            row["overall"]["total"],
+            row["overall"]["percentage"],
+            "; ".join(row["below_threshold"]),
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+# ✅ Students below the attendance threshold, overall or in any subject
+# Query parameters: threshold (default DEFAULTER_THRESHOLD), subjects=DBMS,DAA, since, until, format=json|csv,
+# fresh=true (skip the precomputed snapshot)
+@app.route('/defaulters', methods=['GET'])
+def defaulters():
+    try:
+        since, until = date_arg("since"), date_arg("until")
+        threshold = float(request.args.get("threshold", DEFAULTER_THRESHOLD))
+        if not 0 <= threshold <= 100:
+            raise ValueError("threshold must be between 0 and 100")
+        subjects = [subject for subject in request.args.get("subjects", "").split(",") if subject]
+        output = request.args.get("format", "json")
+        if output not in ("json", "csv"):
+            raise ValueError("format must be json or csv")
+    except ValueError as e:
+        return jsonify({"message": "Invalid query", "error": str(e)}), 400
+
+    pipeline = defaulters_pipeline(threshold, subjects=subjects, since=since, until=until)
+    source = attendance if since or until else attendance_stats
+
+    try:
+        # ✅ The default report (all subjects, all time, configured threshold) is precomputed
+        default_report = not (since or until or subjects) and threshold == DEFAULTER_THRESHOLD
+        if output == "csv":
+            snapshot = latest_snapshot(snapshots.DEFAULTERS) if default_report else None
+            if snapshot is not None:
+                return Response(defaulter_csv_rows(snapshot["rows"]), mimetype="text/csv", headers={
+                    "Content-Disposition": "attachment; filename=defaulters.csv", **snapshot_headers(snapshot)
+                })
+            rows = source.aggregate(pipeline, allowDiskUse=True)
+            return Response(stream_with_context(defaulter_csv_rows(rows)), mimetype="text/csv", headers={
+                "Content-Disposition": "attachment; filename=defaulters.csv"
+            })
+        return cached_json(
+            [("roster", ALL_SUBJECTS)],
+            lambda: list(source.aggregate(pipeline, allowDiskUse=True)),
+            (snapshots.DEFAULTERS, snapshots.ALL) if default_report else None,
+        )
+    except Exception as e:
+        return jsonify({"message": "Failed to compute defaulters", "error": str(e)}), 500
+
+
+# ✅ Bulk import of historical marks for the logged-in faculty's subjects
+# Body: CSV with header student,date,subject,status[,marked_by]; query parameters: chunk_size, workers, start_line
+@app.route('/import/attendance', methods=['POST'])
+@require_role("faculty")
+def import_attendance():
+    faculty = g.user["username"]
+    try:
+        chunk_size = int(request.args.get("chunk_size", 5000))
+        workers = int(request.args.get("workers", 4))
+        start_line = int(request.args.get("start_line", 0))
+        if not (0 < chunk_size <= 50_000 and 0 < workers <= 16 and start_line >= 0):
+            raise ValueError("chunk_size must be 1-50000, workers 1-16, start_line >= 0")
+    except ValueError as e:
+        return jsonify({"message": "Invalid query", "error": str(e)}), 400
+
+    rejected = []
+
+    def keep_sample(line, row, reason):
+        if len(rejected) < 100:
+            rejected.append({"line": line, "reason": reason, "row": row})
+
+    # ✅ Read the upload as a stream instead of loading it into memory
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8-sig", newline="")
+    try:
+        report = import_csv(
+            db, stream, known_students(db), set(faculty_registry.subjects_for(faculty) or ()),
+            chunk_size=chunk_size, workers=workers, start_line=start_line,
+            default_marked_by=faculty, reject=keep_sample,
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"message": "Invalid CSV", "error": str(e)}), 400
+    finally:
+        read_cache.clear()  # too many students and subjects touched to invalidate by tag
+        if analytics is not None:
+            analytics.load(db)
+
+    return jsonify({**report, "rejected_rows": rejected}), 200
+
+
+# ✅ Bulk attendance export for analytics as Arrow IPC stream (default) or Parquet
+# Query parameters: student, subject, since, until, format=arrow|parquet, batch_size
+@app.route('/export/attendance', methods=['GET'])
+def export_attendance():
+    if not export.AVAILABLE:
+        return jsonify({"message": "Export needs pyarrow on the server (pip install pyarrow)"}), 501
+
+    try:
+        query = attendance_filter(
+            student=request.args.get("student"),
+            subject=request.args.get("subject"),
+            since=date_arg("since"),
+            until=date_arg("until"),
+        )
+        output = request.args.get("format", "arrow")
+        if output not in export.FORMATS:
+            raise ValueError(f"format must be one of {', '.join(export.FORMATS)}")
+        batch_size = int(request.args.get("batch_size", EXPORT_BATCH_SIZE))
+        if not 0 < batch_size <= EXPORT_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {EXPORT_BATCH_SIZE}")
+    except ValueError as e:
+        return jsonify({"message": "Invalid query", "error": str(e)}), 400
+
+    # ✅ One record batch in memory at a time, fed by large cursor batches
+    records = attendance.find(query, export.PROJECTION).batch_size(batch_size)
+    mimetype, extension = export.FORMATS[output]
+    body = export.encode(export.record_batches(records, batch_size), output)
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=attendance.{extension}"
+    })
+
+
+def analytics_window():
+    """``(since, until, subjects)`` from the query string (raises ValueError)."""
+    subjects = [subject for subject in request.args.get("subjects", request.args.get("subject", "")).split(",") if subject]
+    return date_arg("since"), date_arg("until"), subjects
+
+
+def analytics_unavailable():
+    return jsonify({"message": "Analytics matrix is disabled (set ANALYTICS_MATRIX=1 and install numpy)"}), 501
+
+
+# ✅ In-memory analytics: roster percentages, defaulters, streaks
+# Query parameters: subject (roster, streaks) or subjects=DBMS,DAA (defaulters), since, until, threshold
+@app.route('/analytics/roster', methods=['GET'])
+def analytics_roster():
+    if analytics is None:
+        return analytics_unavailable()
+    try:
+        since, until, subjects = analytics_window()
+    except ValueError as e:
+        return jsonify({"message": "Invalid query", "error": str(e)}), 400
+    return jsonify(analytics.summary(since=since, until=until, subject=subjects[0] if subjects else None)), 200
+
+
+@app.route('/analytics/defaulters', methods=['GET'])
+def analytics_defaulters():
+    if analytics is None:
+        return analytics_unavailable()
+    try:
+        since, until, subjects = analytics_window()
+        threshold = float(request.args.get("threshold", DEFAULTER_THRESHOLD))
+        if not 0 <= threshold <= 100:
+            raise ValueError("threshold must be between 0 and 100")
+    except ValueError as e:
+        return jsonify({"message": "Invalid query", "error": str(e)}), 400
+    return jsonify(analytics.defaulters(threshold, subjects=subjects, since=since, until=until)), 200
+
+
+@app.route('/analytics/streaks', methods=['GET'])
+def analytics_streaks():
+    if analytics is None:
+        return analytics_unavailable()
+    try:
+        since, until, subjects = analytics_window()
+    except ValueError as e:
+        return jsonify({"message": "Invalid query", "error": str(e)}), 400
+    return jsonify(analytics.streaks(subject=subjects[0] if subjects else None, since=since, until=until)), 200
+
+
+@app.route('/analytics/stats', methods=['GET'])
+def analytics_stats():
+    if analytics is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **analytics.stats()}), 200
+
 
 @app.route("/delete_attendance", methods=["POST"])
+@require_role("faculty")
 def delete_attendance():
     data = request.json
     student = data.get("student")
@@ -162,14 +776,48 @@ def delete_attendance():
     if not student or not date:
         return jsonify({"error": "Student and date are required"}), 400
 
-    result = attendance.delete_one({"student": student, "date": date})
+    # ✅ Only the logged-in faculty's own subject: a session is (student, date, subject)
+    subject, error = faculty_subject(g.user["username"], data)
+    if error:
+        return error
+
+    deleted = delete_mark(db, {"student": student, "date": date, "subject": subject})
 
-    if result.deleted_count > 0:
+    if deleted is not None:
+        invalidate_reads(student, subject)
+        if analytics is not None:
+            analytics.remove({**deleted, "date": date})
         return jsonify({"message": "Attendance deleted successfully"}), 200
     else:
         return jsonify({"error": "No matching record found"}), 404
 
 
+# ✅ Subjects known to the faculty registry, and who teaches them
+@app.route('/subjects', methods=['GET'])
+def subjects():
+    return jsonify({"subjects": faculty_registry.all_subjects(), "faculty": faculty_registry.as_dict()}), 200
+
+
+# ✅ Prometheus scrape endpoint
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+# ✅ Read cache hit/miss counters
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify(read_cache.stats()), 200
+
+
+# ✅ Write-behind queue depth and counters
+@app.route('/write_queue_stats', methods=['GET'])
+def write_queue_stats():
+    if write_behind is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **write_behind.stats()}), 200
+
 
+# ✅ Development server only; production runs wsgi.py under gunicorn (see gunicorn.conf.py)
 if __name__ == '__main__':
-    app.run(debug=True)
+    app.run(debug=DEBUG)
@@ -0,0 +1,269 @@
+"""Optional ASGI backend: the core routes of main.py on Quart and the Motor async driver.
+
+Handlers await MongoDB instead of blocking a worker, so a burst of marks at
+lecture start is bounded by the connection pool (MONGO_MAX_POOL_SIZE and the
+other MONGO_* client settings) rather than by the worker count::
+
+    hypercorn main_async:app --bind 127.0.0.1:8000
+    # or: uvicorn main_async:app --port 8000
+
+Served routes: /login, /mark_attendance, /get_attendance/<student>,
+/get_students, /get_all_attendance, /subjects and /delete_attendance, with
+the same request and response shapes as the Flask app. The faculty
+registry (faculty.py) reloads on its own thread over a small synchronous
+client, off the event loop. Indexes, seeding and counter rebuilds stay
+with ``python manage.py``.
+"""
+import asyncio
+import json
+from functools import wraps
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+from quart import Quart, Response, g, jsonify, request
+from quart_cors import cors
+
+from auth import AuthError, authenticate, check_password, credential_update, issue_token, public_user
+from config import FACULTY_REFRESH_SECONDS, MONGO_CLIENT_OPTIONS, MONGO_URI
+from faculty import FacultyRegistry
+import buckets
+from marks import (
+    BUCKETED, DELETED_PROJECTION, MARKS_SOURCE, bucket_outcome, bucket_plan, bulk_outcome, deleted_delta, mark_key,
+    stats_deltas, stats_ops, status_query, upsert_op
+)
+from pipelines import MAX_PAGE_SIZE, encode_cursor, history_query, parse_date, pick_fields, roster_pipeline
+
+app = cors(Quart(__name__), expose_headers=["X-Next-Cursor"])  # Enable CORS
+
+mongo = None  # AsyncIOMotorClient, created on the serving event loop
+db = None
+faculty_registry = None
+
+
+@app.before_serving
+async def connect():
+    global mongo, db, faculty_registry
+    mongo = AsyncIOMotorClient(MONGO_URI, **MONGO_CLIENT_OPTIONS)
+    db = mongo.get_default_database()
+    faculty_registry = FacultyRegistry(MongoClient(MONGO_URI, maxPoolSize=2).get_default_database().users)
+    faculty_registry.load()
+    faculty_registry.watch(FACULTY_REFRESH_SECONDS)
+
+
+@app.after_serving
+async def disconnect():
+    faculty_registry.close()
+    mongo.close()
+
+
+async def write_marks(marks, ordered=True):
+    """Async twin of ``marks.write_marks``: upsert the marks, then apply the counter deltas."""
+    if not marks:
+        return []
+    if BUCKETED:
+        return await write_bucketed_marks(marks, ordered)
+
+    query, projection = status_query(marks)
+    previous = {mark_key(doc): doc.get("status") async for doc in db.attendance.find(query, projection)}
+    try:
+        result = await db.attendance.bulk_write([upsert_op(mark) for mark in marks], ordered=ordered)
+        errors, inserted = bulk_outcome(marks, ordered, result=result)
+    except BulkWriteError as e:
+        errors, inserted = bulk_outcome(marks, ordered, error=e)
+
+    ops = stats_ops(stats_deltas(marks, previous, errors, inserted))
+    if ops:
+        await db.attendance_stats.bulk_write(ops, ordered=False)
+    return [errors.get(index) for index in range(len(marks))]
+
+
+async def write_bucketed_marks(marks, ordered=True):
+    """Async twin of ``marks.write_bucketed_marks``."""
+    errors, valid = bucket_plan(marks, ordered)
+    if not valid:
+        return [errors.get(index) for index in range(len(marks))]
+
+    query, projection = buckets.status_query([marks[index] for index in valid])
+    previous = {}
+    async for bucket in db[buckets.BUCKETS].find(query, projection):
+        previous.update(buckets.stored_statuses(bucket))
+    try:
+        await db[buckets.BUCKETS].bulk_write([buckets.upsert_op(marks[index]) for index in valid], ordered=ordered)
+        errors, inserted = bucket_outcome(marks, valid, ordered, errors, previous)
+    except BulkWriteError as e:
+        errors, inserted = bucket_outcome(marks, valid, ordered, errors, previous, error=e)
+
+    ops = stats_ops(stats_deltas(marks, previous, errors, inserted))
+    if ops:
+        await db.attendance_stats.bulk_write(ops, ordered=False)
+    return [errors.get(index) for index in range(len(marks))]
+
+
+async def delete_one_mark(query):
+    """Async twin of ``marks.delete_mark`` without the counter update; returns the deleted mark or None."""
+    if not BUCKETED:
+        return await db.attendance.find_one_and_delete(query, DELETED_PROJECTION)
+    try:
+        bucket_query, update, projection = buckets.delete_update(query)
+    except ValueError:
+        return None
+    bucket = await db[buckets.BUCKETS].find_one_and_update(bucket_query, update, projection)
+    return None if bucket is None else buckets.deleted_mark(bucket, query["date"])
+
+
+@app.route('/login', methods=['POST'])
+async def login():
+    data = await request.get_json()
+    user = await db.users.find_one({"username": data["username"]}, {"_id": 0})
+    # Hashing is CPU-bound (~160 ms with scrypt): run it, and the rehash it may do, off the event loop
+    ok, new_hash = await asyncio.to_thread(check_password, user, data.get("password"))
+    if not ok:
+        return jsonify({"message": "Invalid Credentials"}), 401
+    if new_hash:
+        await db.users.update_one({"username": user["username"]}, credential_update(new_hash))
+    return jsonify({**public_user(user), "token": issue_token(user)}), 200
+
+
+def require_role(role):
+    """Same contract as ``main.require_role``."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            try:
+                g.user = authenticate(request.headers.get("Authorization"), role)
+            except AuthError as e:
+                return jsonify({"message": str(e)}), e.status
+            return await view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@app.route('/mark_attendance', methods=['POST'])
+@require_role("faculty")
+async def mark_attendance():
+    data = await request.get_json()
+
+    faculty = g.user["username"]
+    if data.get("faculty", faculty) != faculty:
+        return jsonify({"message": "faculty does not match the logged-in user"}), 403
+
+    subject, error = faculty_registry.resolve(faculty, data.get("subject"))
+
+    if error:
+        message, status = error
+        return jsonify({"message": message}), status
+
+    try:
+        day = parse_date(data.get("date"))
+    except (TypeError, ValueError):
+        day = None
+    if not day:
+        return jsonify({"message": "date must be a YYYY-MM-DD date"}), 400
+
+    try:
+        error, = await write_marks([{
+            "student": data["student"],
+            "date": day,
+            "status": data["status"],
+            "marked_by": faculty,
+            "subject": subject
+        }])
+        if error:
+            return jsonify({"message": "Failed to update attendance", "error": error}), 500
+        return jsonify({"message": "Attendance marked successfully"}), 200
+    except Exception as e:
+        return jsonify({"message": "Failed to update attendance", "error": str(e)}), 500
+
+
+async def stream_json_array(records, fields):
+    """Encode an async cursor as a JSON array one record at a time."""
+    yield "["
+    first = True
+    async for record in records:
+        yield ("" if first else ",") + json.dumps(pick_fields(record, fields))
+        first = False
+    yield "]"
+
+
+@app.route('/get_attendance/<student>', methods=['GET'])
+async def get_attendance(student):
+    try:
+        query, projection, fields, limit = history_query(student, request.args)
+    except ValueError as e:
+        return jsonify({"message": "Invalid query", "error": str(e)}), 400
+
+    try:
+        records = db[MARKS_SOURCE].find(query, projection).sort([("date", 1), ("subject", 1)])
+
+        if limit is None:
+            records = records.batch_size(MAX_PAGE_SIZE)
+            return Response(stream_json_array(records, fields), mimetype="application/json")
+
+        page = await records.limit(limit + 1).to_list(None)
+        headers = {}
+        if len(page) > limit:
+            page = page[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(page[-1])
+        return jsonify([pick_fields(record, fields) for record in page]), 200, headers
+    except Exception as e:
+        return jsonify({"message": "Failed to fetch attendance", "error": str(e)}), 500
+
+
+@app.route('/get_students', methods=['GET'])
+async def get_students():
+    try:
+        student_list = await db.users.find({"role": "student"}, {"_id": 0, "username": 1}).to_list(None)
+        return jsonify([student["username"] for student in student_list]), 200
+    except Exception as e:
+        return jsonify({"message": "Failed to fetch students", "error": str(e)}), 500
+
+
+@app.route('/get_all_attendance', methods=['GET'])
+async def get_all_attendance():
+    try:
+        since, until = parse_date(request.args.get("since")), parse_date(request.args.get("until"))
+    except ValueError:
+        return jsonify({"error": "since/until must be YYYY-MM-DD dates"}), 400
+
+    try:
+        pipeline = roster_pipeline(subject=request.args.get("subject"), since=since, until=until, marks=MARKS_SOURCE)
+        return jsonify(await db.users.aggregate(pipeline).to_list(None)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/delete_attendance", methods=["POST"])
+@require_role("faculty")
+async def delete_attendance():
+    data = await request.get_json()
+    student = data.get("student")
+    date = data.get("date")
+
+    if not student or not date:
+        return jsonify({"error": "Student and date are required"}), 400
+
+    subject, error = faculty_registry.resolve(g.user["username"], data.get("subject"))
+
+    if error:
+        message, status = error
+        return jsonify({"message": message}), status
+
+    deleted = await delete_one_mark({"student": student, "date": date, "subject": subject})
+
+    if deleted is not None:
+        ops = stats_ops(deleted_delta(deleted))
+        if ops:
+            await db.attendance_stats.bulk_write(ops, ordered=False)
+        return jsonify({"message": "Attendance deleted successfully"}), 200
+    else:
+        return jsonify({"error": "No matching record found"}), 404
+
+
+@app.route('/subjects', methods=['GET'])
+async def subjects():
+    return jsonify({"subjects": faculty_registry.all_subjects(), "faculty": faculty_registry.as_dict()}), 200
+
+
+if __name__ == '__main__':
+    app.run(port=8000)
@@ -0,0 +1,235 @@
+"""Maintenance commands for the Attender database.
+
+Usage::
+
+    python manage.py seed             # remove duplicate users, add missing default users
+    python manage.py ensure-indexes   # create the documented index set
+    python manage.py explain          # fail if any endpoint query is a COLLSCAN
+    python manage.py dedup            # collapse duplicate attendance marks
+    python manage.py rebuild-stats    # recompute attendance_stats from the marks
+    python manage.py subjects [USERNAME SUBJECT...]  # list or set the subjects a faculty teaches
+    python manage.py hash-passwords   # replace plaintext passwords with PASSWORD_HASH_METHOD hashes
+    python manage.py import-csv FILE [--resume]  # bulk-load historical attendance
+    python manage.py migrate-buckets [--drop-flat]  # copy marks into the bucketed schema
+    python manage.py snapshot-reports [--full]  # refresh the precomputed roster and defaulter reports
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from pymongo import MongoClient
+
+import buckets
+import snapshots
+from config import DEFAULTER_THRESHOLD, MONGO_URI
+from indexes import check_query_plans, ensure_indexes, print_index_report
+from marks import dedupe_attendance, rebuild_stats
+from faculty import FacultyRegistry
+from importer import import_csv, known_students, known_subjects
+from seed import dedupe_users, hash_legacy_passwords, seed_faculty_subjects, seed_users, set_faculty_subjects
+
+
+def get_db(uri=MONGO_URI):
+    return MongoClient(uri).get_default_database()
+
+
+def cmd_ensure_indexes(db, args):
+    report = ensure_indexes(db)
+    print_index_report(report)
+    return 1 if report["failed"] else 0
+
+
+def cmd_explain(db, args):
+    failed = 0
+    for endpoint, stages, uses_index in check_query_plans(db):
+        mark = "✅" if uses_index else "❌"
+        print(f"{mark} {endpoint}: {' > '.join(stages)}")
+        failed += not uses_index
+    return 1 if failed else 0
+
+
+def cmd_seed(db, args):
+    removed = dedupe_users(db.users)
+    print(f"✅ Removed {removed} duplicate user documents")
+    inserted = seed_users(db.users)
+    print(f"✅ Inserted {inserted} default users")
+    print(f"✅ Assigned default subjects to {seed_faculty_subjects(db.users)} faculty")
+    return cmd_ensure_indexes(db, args)
+
+
+def cmd_dedup(db, args):
+    sessions, removed = dedupe_attendance(db.attendance)
+    print(f"✅ Collapsed {sessions} duplicated class sessions ({removed} documents removed)")
+    if args.compact:
+        db.command("compact", "attendance")
+        print("✅ attendance collection compacted")
+    status = cmd_ensure_indexes(db, args)
+    cmd_rebuild_stats(db, args)
+    return status
+
+
+def cmd_rebuild_stats(db, args):
+    print(f"✅ attendance_stats rebuilt: {rebuild_stats(db)} counters")
+    return 0
+
+
+def cmd_subjects(db, args):
+    if args.username:
+        if not set_faculty_subjects(db.users, args.username, args.subjects):
+            print(f"❌ No faculty user {args.username}")
+            return 1
+        print(f"✅ {args.username} now teaches {', '.join(args.subjects) or 'nothing'}")
+        return 0
+
+    registry = FacultyRegistry(db.users)
+    registry.load()
+    for username, subjects in registry.as_dict().items():
+        print(f"{username}: {', '.join(subjects) or '-'}")
+    return 0
+
+
+def cmd_hash_passwords(db, args):
+    print(f"✅ Hashed {hash_legacy_passwords(db.users)} plaintext passwords")
+    return 0
+
+
+def print_progress(report):
+    print(f"… {report['read']} rows read, {report['written']} written, {report['rejected']} rejected "
+          f"({report['rows_per_second']} rows/s)")
+
+
+def cmd_import_csv(db, args):
+    checkpoint_path = args.checkpoint or args.file + ".checkpoint"
+    start_line = 0
+    if args.resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            start_line = json.load(f)["line"]
+        print(f"✅ Resuming after line {start_line}")
+
+    def save_checkpoint(line):
+        with open(checkpoint_path + ".tmp", "w") as f:
+            json.dump({"file": os.path.abspath(args.file), "line": line}, f)
+        os.replace(checkpoint_path + ".tmp", checkpoint_path)  # never leave a half-written checkpoint
+
+    rejects_file = open(args.rejects, "a", newline="") if args.rejects else None
+    rejects = csv.writer(rejects_file) if rejects_file else None
+    try:
+        with open(args.file, newline="", encoding="utf-8-sig") as f:
+            report = import_csv(
+                db, f, known_students(db), known_subjects(db),
+                chunk_size=args.chunk_size,
+                workers=args.workers,
+                start_line=start_line,
+                checkpoint=save_checkpoint,
+                progress=print_progress,
+                reject=(lambda line, row, reason: rejects.writerow([line, reason, json.dumps(row)])) if rejects else None,
+            )
+    finally:
+        if rejects_file:
+            rejects_file.close()
+
+    print(f"✅ Imported {report['written']} marks from {report['read']} rows in {report['seconds']}s "
+          f"({report['rows_per_second']} rows/s)")
+    for reason, count in sorted(report["reasons"].items()):
+        print(f"❌ {count} rows rejected: {reason}")
+    return 1 if report["rejected"] else 0
+
+
+def cmd_migrate_buckets(db, args):
+    status = cmd_ensure_indexes(db, args)
+    buckets.ensure_view(db)
+    report = buckets.migrate(db)
+    print(f"✅ Migrated {report['marks']} marks into {report['buckets']} monthly buckets")
+    if report["skipped"]:
+        print(f"⚠ {report['skipped']} marks skipped: date is not YYYY-MM-DD")
+
+    for name, stats in buckets.storage_report(db, ["attendance", buckets.BUCKETS]).items():
+        print(f"   {name}: {stats['documents']} documents, {stats['storage_bytes']} bytes stored, "
+              f"{stats['index_bytes']} bytes of indexes")
+
+    # ✅ Every migrated mark must read back through the view before the flat copy can go
+    visible = db[buckets.VIEW].count_documents({})
+    if visible < report["marks"]:
+        print(f"❌ attendance_marks shows {visible} of {report['marks']} marks - run `python manage.py dedup` "
+              "first if the flat collection has duplicate sessions")
+        return 1
+    print(f"✅ attendance_marks shows all {visible} marks; set ATTENDANCE_SCHEMA=bucketed and restart")
+    if args.drop_flat:
+        db.attendance.drop()
+        print("✅ Flat attendance collection dropped")
+    return status
+
+
+def cmd_snapshot_reports(db, args):
+    holder = snapshots.lease_holder()
+    if not snapshots.acquire_lease(db, holder, snapshots.ONE_OFF_LEASE_SECONDS):
+        print("❌ Another process holds the snapshot lease (SNAPSHOT_INTERVAL_SECONDS is set on the servers?)")
+        return 1
+    try:
+        report = snapshots.run(db, DEFAULTER_THRESHOLD, known_subjects(db), full=args.full)
+    finally:
+        snapshots.release_lease(db, holder)
+    print(f"✅ Snapshots written: {', '.join(report['written']) or 'none'} "
+          f"({report['recomputed']} student rows recomputed)")
+    print(f"✅ Snapshots unchanged: {', '.join(report['unchanged']) or 'none'}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Attender database maintenance")
+    parser.add_argument("--mongo-uri", default=MONGO_URI, help="MongoDB connection string")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sub = subparsers.add_parser("seed", help="Remove duplicate users, insert missing default users, ensure indexes")
+    sub.set_defaults(func=cmd_seed)
+
+    sub = subparsers.add_parser("ensure-indexes", help="Create missing indexes and print a report")
+    sub.set_defaults(func=cmd_ensure_indexes)
+
+    sub = subparsers.add_parser("explain", help="Check that every endpoint query uses an index (IXSCAN, not COLLSCAN)")
+    sub.set_defaults(func=cmd_explain)
+
+    sub = subparsers.add_parser("dedup", help="Keep only the latest mark per (student, date, subject), then add the unique index")
+    sub.add_argument("--compact", action="store_true", help="Run MongoDB compact afterwards to release freed space")
+    sub.set_defaults(func=cmd_dedup)
+
+    sub = subparsers.add_parser("rebuild-stats", help="Recompute the attendance_stats counters from scratch")
+    sub.set_defaults(func=cmd_rebuild_stats)
+
+    sub = subparsers.add_parser("subjects", help="List faculty subjects, or replace the subjects one faculty teaches")
+    sub.add_argument("username", nargs="?", help="Faculty username to update (list all when omitted)")
+    sub.add_argument("subjects", nargs="*", help="Subjects taught by USERNAME")
+    sub.set_defaults(func=cmd_subjects)
+
+    sub = subparsers.add_parser("hash-passwords", help="Hash every plaintext password left by older versions")
+    sub.set_defaults(func=cmd_hash_passwords)
+
+    sub = subparsers.add_parser("import-csv", help="Import attendance from a CSV (student,date,subject,status[,marked_by])")
+    sub.add_argument("file", help="CSV file with a header row")
+    sub.add_argument("--chunk-size", type=int, default=5000, help="Marks per bulk_write")
+    sub.add_argument("--workers", type=int, default=4, help="Chunks written in parallel")
+    sub.add_argument("--checkpoint", help="Checkpoint file (default: FILE.checkpoint)")
+    sub.add_argument("--resume", action="store_true", help="Skip the rows recorded in the checkpoint")
+    sub.add_argument("--rejects", help="Append rejected rows (line, reason, row) to this CSV")
+    sub.set_defaults(func=cmd_import_csv)
+
+    sub = subparsers.add_parser("migrate-buckets", help="Copy the flat attendance marks into monthly buckets (re-runnable)")
+    sub.add_argument("--drop-flat", action="store_true", help="Drop the flat attendance collection once verified")
+    sub.set_defaults(func=cmd_migrate_buckets)
+
+    sub = subparsers.add_parser("snapshot-reports", help="Refresh the precomputed roster and defaulter reports (run nightly)")
+    sub.add_argument("--full", action="store_true", help="Recompute every row instead of only changed students")
+    sub.set_defaults(func=cmd_snapshot_reports)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(get_db(args.mongo_uri), args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""Attendance write path shared by the marking endpoints of both backends.
+
+The planning helpers (``status_query``, ``bulk_outcome``, ``stats_deltas``,
+``stats_ops``) are driver-agnostic; ``write_marks``/``delete_mark`` run them
+on pymongo and main_async.py runs them on Motor.
+
+A class session is identified by (student, date, subject): marking the same
+session again updates its status instead of adding another document. The
+unique ``attendance.student_date_subject_unique`` index backs this up.
+
+Every write also keeps the ``attendance_stats`` counters in step: one
+document per (student, subject) holding ``present`` and ``total``, changed
+with ``$inc`` so concurrent writers never overwrite each other. If the
+counters ever drift (e.g. two faculty flipping the same mark at the same
+moment), ``rebuild_stats`` recomputes them from the marks.
+
+With ``ATTENDANCE_SCHEMA=bucketed`` the marks are stored as month buckets
+(see buckets.py) instead: ``write_marks`` and ``delete_mark`` switch to the
+bucket operations, and reads go through ``MARKS_SOURCE``, the view that shows
+the buckets as flat mark documents.
+"""
+from collections import defaultdict
+
+from pymongo import DeleteMany, UpdateOne
+from pymongo.errors import BulkWriteError
+
+import buckets
+from config import ATTENDANCE_SCHEMA
+
+MARK_KEY = ("student", "date", "subject")
+DELETED_PROJECTION = {"_id": 0, "student": 1, "subject": 1, "status": 1}
+
+BUCKETED = ATTENDANCE_SCHEMA == "bucketed"
+# Collection (or view) holding one flat document per mark, for every read
+MARKS_SOURCE = buckets.VIEW if BUCKETED else "attendance"
+
+
+def mark_key(mark):
+    return tuple(mark.get(field) for field in MARK_KEY)
+
+
+def upsert_op(mark):
+    """``UpdateOne`` that creates or overwrites the session document for ``mark``."""
+    key = {field: mark[field] for field in MARK_KEY}
+    values = {field: value for field, value in mark.items() if field not in MARK_KEY}
+    return UpdateOne(key, {"$set": values}, upsert=True)
+
+
+def status_query(marks):
+    """``(filter, projection)`` fetching the stored status of every session in ``marks`` in one query."""
+    students = defaultdict(set)
+    for mark in marks:
+        students[(mark["date"], mark["subject"])].add(mark["student"])
+    query = {"$or": [
+        {"date": day, "subject": subject, "student": {"$in": sorted(names)}}
+        for (day, subject), names in students.items()
+    ]}
+    return query, {"_id": 0, "student": 1, "date": 1, "subject": 1, "status": 1}
+
+
+def bulk_outcome(marks, ordered, result=None, error=None):
+    """``(errors, inserted)`` from a ``BulkWriteResult`` or the ``BulkWriteError`` raised instead.
+
+    ``errors`` maps mark index -> message; ``inserted`` holds the indexes that created a new session.
+    """
+    if error is None:
+        return {}, set(result.upserted_ids)
+
+    errors = {e["index"]: e["errmsg"] for e in error.details["writeErrors"]}
+    inserted = {upsert["index"] for upsert in error.details["upserted"]}
+    if ordered and errors:
+        first_failure = min(errors)
+        for index in range(first_failure + 1, len(marks)):
+            errors[index] = "Not attempted (ordered write stopped at an earlier error)"
+    return errors, inserted
+
+
+def stats_deltas(marks, previous, errors, inserted):
+    """Counter changes ``{(student, subject): {"present": n, "total": n}}`` caused by a marks batch.
+
+    ``previous`` maps ``mark_key`` -> status stored before the write.
+    """
+    previous = dict(previous)
+    deltas = defaultdict(lambda: {"present": 0, "total": 0})
+    for index, mark in enumerate(marks):
+        if index in errors:
+            continue
+        key = mark_key(mark)
+        delta = deltas[(mark["student"], mark["subject"])]
+        is_present = mark["status"] == "Present"
+        if index in inserted:
+            delta["total"] += 1
+            delta["present"] += is_present
+        elif key in previous:
+            # ✅ Re-mark: only a status flip changes the present count
+            delta["present"] += is_present - (previous[key] == "Present")
+        previous[key] = mark["status"]
+    return deltas
+
+
+def deleted_delta(deleted):
+    """Counter change for a deleted mark document."""
+    return {(deleted["student"], deleted.get("subject")): {
+        "present": -(deleted.get("status") == "Present"),
+        "total": -1,
+    }}
+
+
+def stats_ops(deltas):
+    """``$inc`` upserts on ``attendance_stats`` for non-zero ``deltas``, stamping ``updated_at``.
+
+    ``updated_at`` tells the report snapshot job (snapshots.py) which counters changed since its last run.
+    """
+    return [
+        UpdateOne({"student": student, "subject": subject},
+                  {"$inc": delta, "$currentDate": {"updated_at": True}}, upsert=True)
+        for (student, subject), delta in deltas.items()
+        if delta["present"] or delta["total"]
+    ]
+
+
+def write_marks(db, marks, ordered=True):
+    """Upsert attendance marks with a single ``bulk_write`` and update the counters.
+
+    Returns one error message (or ``None`` on success) per mark, in input order.
+    With ``ordered=True`` MongoDB stops at the first failure, so the marks after
+    it are reported as not attempted.
+    """
+    if not marks:
+        return []
+    if BUCKETED:
+        return write_bucketed_marks(db, marks, ordered)
+
+    query, projection = status_query(marks)
+    previous = {mark_key(doc): doc.get("status") for doc in db.attendance.find(query, projection)}
+    try:
+        result = db.attendance.bulk_write([upsert_op(mark) for mark in marks], ordered=ordered)
+        errors, inserted = bulk_outcome(marks, ordered, result=result)
+    except BulkWriteError as e:
+        errors, inserted = bulk_outcome(marks, ordered, error=e)
+
+    update_stats(db, stats_deltas(marks, previous, errors, inserted))
+    return [errors.get(index) for index in range(len(marks))]
+
+
+def bucket_plan(marks, ordered):
+    """``(errors, valid)`` for the bucketed schema: marks refused before the write, indexes of the others.
+
+    A mark whose date is not ``YYYY-MM-DD`` has no bucket to go in.
+    """
+    errors = {}
+    for index, mark in enumerate(marks):
+        try:
+            buckets.split_date(mark["date"])
+        except ValueError as e:
+            errors[index] = str(e)
+    if ordered and errors:
+        for index in range(min(errors) + 1, len(marks)):
+            errors.setdefault(index, "Not attempted (ordered write stopped at an earlier error)")
+    return errors, [index for index in range(len(marks)) if index not in errors]
+
+
+def bucket_outcome(marks, valid, ordered, errors, previous, error=None):
+    """``(errors, inserted)`` after writing ``valid`` marks to their buckets (``error``: the BulkWriteError raised)."""
+    errors = dict(errors)
+    if error is not None:
+        # bulk indexes count the valid marks only
+        failed, _ = bulk_outcome(valid, ordered, error=error)
+        errors.update({valid[index]: message for index, message in failed.items()})
+    return errors, buckets.new_sessions([mark_key(mark) for mark in marks], previous, errors)
+
+
+def write_bucketed_marks(db, marks, ordered=True):
+    """``write_marks`` for the bucketed schema: one ``$set`` of the day field per mark."""
+    errors, valid = bucket_plan(marks, ordered)
+    if not valid:
+        return [errors.get(index) for index in range(len(marks))]
+
+    query, projection = buckets.status_query([marks[index] for index in valid])
+    previous = dict(
+        item for bucket in db[buckets.BUCKETS].find(query, projection) for item in buckets.stored_statuses(bucket)
+    )
+    try:
+        db[buckets.BUCKETS].bulk_write([buckets.upsert_op(marks[index]) for index in valid], ordered=ordered)
+        errors, inserted = bucket_outcome(marks, valid, ordered, errors, previous)
+    except BulkWriteError as e:
+        errors, inserted = bucket_outcome(marks, valid, ordered, errors, previous, error=e)
+
+    update_stats(db, stats_deltas(marks, previous, errors, inserted))
+    return [errors.get(index) for index in range(len(marks))]
+
+
+def delete_mark(db, query):
+    """Delete one mark matching ``query`` and take it off the counters. Returns the deleted document or None."""
+    if BUCKETED:
+        return delete_bucketed_mark(db, query)
+    deleted = db.attendance.find_one_and_delete(query, DELETED_PROJECTION)
+    if deleted is not None:
+        update_stats(db, deleted_delta(deleted))
+    return deleted
+
+
+def delete_bucketed_mark(db, query):
+    try:
+        bucket_query, update, projection = buckets.delete_update(query)
+    except ValueError:
+        return None
+    bucket = db[buckets.BUCKETS].find_one_and_update(bucket_query, update, projection)
+    if bucket is None:
+        return None
+    deleted = buckets.deleted_mark(bucket, query["date"])
+    update_stats(db, deleted_delta(deleted))
+    return deleted
+
+
+def update_stats(db, deltas):
+    """Apply ``{(student, subject): {"present": n, "total": n}}`` to ``attendance_stats`` in one bulk write."""
+    ops = stats_ops(deltas)
+    if ops:
+        db.attendance_stats.bulk_write(ops, ordered=False)
+
+
+def rebuild_stats(db):
+    """Recompute ``attendance_stats`` from scratch (``$out`` swaps it in atomically, keeping its indexes)."""
+    db[MARKS_SOURCE].aggregate([
+        {"$group": {
+            "_id": {"student": "$student", "subject": {"$ifNull": ["$subject", "Unknown"]}},
+            "total": {"$sum": 1},
+            "present": {"$sum": {"$cond": [{"$eq": ["$status", "Present"]}, 1, 0]}},
+        }},
+        {"$project": {
+            "_id": 0, "student": "$_id.student", "subject": "$_id.subject", "present": 1, "total": 1,
+            "updated_at": "$$NOW",
+        }},
+        {"$out": "attendance_stats"},
+    ], allowDiskUse=True)
+    return db.attendance_stats.count_documents({})
+
+
+def dedupe_attendance(collection, batch_size=1000):
+    """Collapse duplicate (student, date, subject) documents, keeping the latest one.
+
+    ``_id`` is an ObjectId, so the highest id is the most recently inserted mark.
+    Returns ``(sessions_collapsed, documents_removed)``.
+    """
+    duplicates = collection.aggregate([
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": {field: f"${field}" for field in MARK_KEY},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+
+    sessions = removed = 0
+    ops = []
+    for group in duplicates:
+        sessions += 1
+        stale_ids = group["ids"][:-1]
+        removed += len(stale_ids)
+        ops.append(DeleteMany({"_id": {"$in": stale_ids}}))
+        if len(ops) >= batch_size:
+            collection.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+
+    return sessions, removed
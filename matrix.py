@@ -0,0 +1,310 @@
+"""In-memory attendance matrix for institution-wide analytics.
+
+Every mark is a 2-bit code in a packed ``uint8`` array of shape
+``(students, subjects, ceil(days / 4))``: four class days per byte, students
+and subjects integer-coded, days counted from the earliest date seen. One
+semester for a few thousand students fits in a few megabytes, against
+hundreds of bytes per mark as dict rows.
+
+Codes: 0 no mark, 1 Absent, 2 Present, 3 any other status (e.g. "No
+College"). As in the aggregation pipelines, every mark counts towards
+``total`` and only Present counts towards ``present``.
+
+Queries unpack only the days they need and reduce with NumPy; writes update
+single cells under a lock (``apply`` / ``remove``), and ``load`` rebuilds the
+whole matrix from MongoDB; with several workers, ``refresh_every`` picks up
+marks written by the others.
+
+NumPy is optional for the backend; ``AVAILABLE`` is False without it.
+"""
+import threading
+import time
+from datetime import date, timedelta
+
+from marks import MARKS_SOURCE
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the deployment
+    np = None
+
+AVAILABLE = np is not None
+
+NO_MARK, ABSENT, PRESENT, OTHER = 0, 1, 2, 3
+CODES = {"Absent": ABSENT, "Present": PRESENT}
+DAYS_PER_BYTE = 4
+GROW_DAYS = 128  # days added at a time when a mark falls outside the range
+
+
+def status_code(status):
+    return CODES.get(status, OTHER)
+
+
+def mark_day(value):
+    """The ``date`` of a ``YYYY-MM-DD`` mark date, or None for anything else (such marks are skipped)."""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def percentages(present, total):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, np.round(present / np.maximum(total, 1) * 100, 2), 0.0)
+
+
+def longest_and_current_runs(hit, reset):
+    """Per row: longest and trailing run of ``hit`` cells, broken only by ``reset`` cells.
+
+    Cells that are neither (no class that day) are skipped without breaking a run.
+    """
+    hits = np.cumsum(hit, axis=1, dtype=np.int32)
+    # hits count at the latest reset so far; hits never decreases, so a running max finds it
+    at_reset = np.maximum.accumulate(np.where(reset, hits, 0), axis=1)
+    runs = hits - at_reset
+    if runs.shape[1] == 0:
+        empty = np.zeros(runs.shape[0], dtype=np.int32)
+        return empty, empty
+    return runs.max(axis=1), runs[:, -1]
+
+
+class AttendanceMatrix:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset([], [], None, 0)
+        self.loaded_at = None
+        self.load_seconds = None
+        self.skipped = 0  # marks without a student or a YYYY-MM-DD date
+
+    def _reset(self, students, subjects, first_day, days):
+        self.students = list(students)
+        self.subjects = list(subjects)
+        self.student_index = {name: i for i, name in enumerate(self.students)}
+        self.subject_index = {name: i for i, name in enumerate(self.subjects)}
+        self.first_day = first_day
+        self.days = days  # capacity in days, a multiple of DAYS_PER_BYTE
+        self.packed = np.zeros((len(self.students), len(self.subjects), days // DAYS_PER_BYTE), dtype=np.uint8)
+
+    # ---- loading and sync --------------------------------------------------
+    def load(self, db, batch_size=10000):
+        """Rebuild the matrix from the stored marks (and the student roster). Returns the number of marks.
+
+        Marks are read and packed ``batch_size`` at a time; the new matrix replaces
+        the current one only once it is complete.
+        """
+        started = time.perf_counter()
+        fresh = AttendanceMatrix()
+        fresh._add_rows(sorted(db.users.distinct("username", {"role": "student"})))
+        projection = {"_id": 0, "student": 1, "date": 1, "subject": 1, "status": 1}
+        chunk, count = [], 0
+        for doc in db[MARKS_SOURCE].find({}, projection).batch_size(batch_size):
+            chunk.append(doc)
+            if len(chunk) >= batch_size:
+                fresh._pack(chunk)
+                count, chunk = count + len(chunk), []
+        if chunk:
+            fresh._pack(chunk)
+            count += len(chunk)
+
+        with self._lock:
+            for name in ("students", "subjects", "student_index", "subject_index", "first_day", "days", "packed", "skipped"):
+                setattr(self, name, getattr(fresh, name))
+            self.loaded_at = time.time()
+            self.load_seconds = time.perf_counter() - started
+        return count
+
+    def _pack(self, docs):
+        """Write a batch of mark documents into the matrix with vectorised index arithmetic."""
+        days = [mark_day(doc.get("date")) for doc in docs]
+        kept = [(doc, day) for doc, day in zip(docs, days) if day is not None and doc.get("student")]
+        self.skipped += len(docs) - len(kept)
+        if not kept:
+            return
+        docs = [doc for doc, _ in kept]
+        self._add_rows(dict.fromkeys(doc["student"] for doc in docs))
+        self._add_columns(dict.fromkeys(doc.get("subject") or "Unknown" for doc in docs))
+        day_numbers = np.array([day for _, day in kept], dtype="datetime64[D]")
+        self._day_offset(day_numbers.min().item())
+        self._day_offset(day_numbers.max().item())  # both ends grown before computing offsets
+        offsets = (day_numbers - np.datetime64(self.first_day, "D")).astype(np.int64)
+
+        rows = np.fromiter((self.student_index[doc["student"]] for doc in docs), np.int64, len(docs))
+        cols = np.fromiter((self.subject_index[doc.get("subject") or "Unknown"] for doc in docs), np.int64, len(docs))
+        codes = np.fromiter((status_code(doc.get("status")) for doc in docs), np.uint8, len(docs))
+        cells = (rows, cols, offsets // DAYS_PER_BYTE)
+        shifts = ((offsets % DAYS_PER_BYTE) * 2).astype(np.uint8)
+        np.bitwise_and.at(self.packed, cells, ~(np.uint8(3) << shifts))
+        np.bitwise_or.at(self.packed, cells, codes << shifts)
+
+    def refresh_every(self, db, interval):
+        """Reload from ``db`` every ``interval`` seconds on a daemon thread."""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.load(db)
+                except Exception as e:
+                    print(f"❌ Attendance matrix reload failed: {e}")
+        threading.Thread(target=run, name="attendance-matrix", daemon=True).start()
+
+    def apply(self, marks):
+        """Record written marks (dicts with student, date, subject, status)."""
+        with self._lock:
+            for mark in marks:
+                self._set(mark, status_code(mark.get("status")))
+
+    def remove(self, mark):
+        """Clear the cell of a deleted mark."""
+        with self._lock:
+            self._set(mark, NO_MARK)
+
+    def _set(self, mark, code):
+        student, subject, day = mark.get("student"), mark.get("subject") or "Unknown", mark_day(mark.get("date"))
+        if day is None or not student:
+            self.skipped += 1
+            return
+        if code == NO_MARK and (student not in self.student_index or subject not in self.subject_index):
+            return
+        row = self._row(student)
+        col = self._column(subject)
+        offset = self._day_offset(day)
+        byte, shift = divmod(offset, DAYS_PER_BYTE)
+        cell = self.packed[row, col, byte]
+        self.packed[row, col, byte] = (cell & ~np.uint8(3 << (shift * 2))) | np.uint8(code << (shift * 2))
+
+    def _row(self, student):
+        self._add_rows([student])
+        return self.student_index[student]
+
+    def _column(self, subject):
+        self._add_columns([subject])
+        return self.subject_index[subject]
+
+    def _add_rows(self, students):
+        new = [student for student in students if student not in self.student_index]
+        if new:
+            for student in new:
+                self.student_index[student] = len(self.students)
+                self.students.append(student)
+            shape = (len(new),) + self.packed.shape[1:]
+            self.packed = np.concatenate([self.packed, np.zeros(shape, np.uint8)], axis=0)
+
+    def _add_columns(self, subjects):
+        new = [subject for subject in subjects if subject not in self.subject_index]
+        if new:
+            for subject in new:
+                self.subject_index[subject] = len(self.subjects)
+                self.subjects.append(subject)
+            shape = (self.packed.shape[0], len(new), self.packed.shape[2])
+            self.packed = np.concatenate([self.packed, np.zeros(shape, np.uint8)], axis=1)
+
+    def _day_offset(self, day):
+        """Offset of ``day`` from ``first_day``, growing the day axis (either end) as needed."""
+        if self.first_day is None:
+            self.first_day = day
+        offset = (day - self.first_day).days
+        if offset < 0:
+            # Prepend whole bytes so existing cells keep their position within a byte
+            extra = -(-(-offset) // GROW_DAYS) * GROW_DAYS
+            shape = self.packed.shape[:2] + (extra // DAYS_PER_BYTE,)
+            self.packed = np.concatenate([np.zeros(shape, np.uint8), self.packed], axis=2)
+            self.first_day -= timedelta(days=extra)
+            self.days += extra
+            offset += extra
+        if offset >= self.days:
+            extra = -(-(offset + 1 - self.days) // GROW_DAYS) * GROW_DAYS
+            shape = self.packed.shape[:2] + (extra // DAYS_PER_BYTE,)
+            self.packed = np.concatenate([self.packed, np.zeros(shape, np.uint8)], axis=2)
+            self.days += extra
+        return offset
+
+    # ---- queries -----------------------------------------------------------
+    def codes(self, since=None, until=None, subjects=None):
+        """Unpacked ``(students, subjects, days)`` code array for a window; also returns the subject names."""
+        with self._lock:
+            if subjects:
+                picked = [self.subject_index[s] for s in subjects if s in self.subject_index]
+            else:
+                picked = list(range(len(self.subjects)))
+            names = [self.subjects[i] for i in picked]
+            if self.first_day is None or not picked:
+                return np.zeros((len(self.students), len(picked), 0), np.uint8), names
+            start = max(0, (date.fromisoformat(since) - self.first_day).days) if since else 0
+            stop = min(self.days, (date.fromisoformat(until) - self.first_day).days + 1) if until else self.days
+            if stop <= start:
+                return np.zeros((len(self.students), len(picked), 0), np.uint8), names
+            window = self.packed[:, picked, start // DAYS_PER_BYTE:-(-stop // DAYS_PER_BYTE)]
+        unpacked = (window[..., None] >> (np.arange(DAYS_PER_BYTE, dtype=np.uint8) * 2)) & 3
+        unpacked = unpacked.reshape(window.shape[0], window.shape[1], -1)
+        skip = start % DAYS_PER_BYTE
+        return unpacked[:, :, skip:skip + stop - start], names
+
+    def counts(self, since=None, until=None, subjects=None):
+        """``(present, total, subject names)``, both ``(students, subjects)`` arrays."""
+        codes, names = self.codes(since, until, subjects)
+        present = np.count_nonzero(codes == PRESENT, axis=2)
+        total = np.count_nonzero(codes != NO_MARK, axis=2)
+        return present, total, names
+
+    def summary(self, since=None, until=None, subject=None):
+        """Roster rows shaped like ``/get_all_attendance``."""
+        present, total, _ = self.counts(since, until, [subject] if subject else None)
+        present, total = present.sum(axis=1), total.sum(axis=1)
+        rates = percentages(present, total)
+        return sorted((
+            {"Roll No": student, "Total Classes": int(t), "Present Days": int(p), "Attendance %": float(r)}
+            for student, p, t, r in zip(self.students, present, total, rates)
+        ), key=lambda row: row["Roll No"])
+
+    def defaulters(self, threshold, subjects=None, since=None, until=None):
+        """Students below ``threshold`` overall or in any subject, like ``/defaulters`` (without names)."""
+        present, total, names = self.counts(since, until, subjects)
+        subject_rates = percentages(present, total)
+        below = (subject_rates < threshold) & (total > 0)
+        overall_present, overall_total = present.sum(axis=1), total.sum(axis=1)
+        overall = percentages(overall_present, overall_total)
+        flagged = np.flatnonzero(((overall < threshold) & (overall_total > 0)) | below.any(axis=1))
+        flagged = sorted(flagged, key=lambda i: self.students[i])
+        return [{
+            "student": self.students[i],
+            "overall": {"present": int(overall_present[i]), "total": int(overall_total[i]),
+                        "percentage": float(overall[i])},
+            "subjects": [
+                {"subject": name, "present": int(present[i, j]), "total": int(total[i, j]),
+                 "percentage": float(subject_rates[i, j])}
+                for j, name in enumerate(names) if total[i, j]
+            ],
+            "below_threshold": [name for j, name in enumerate(names) if below[i, j]],
+            "overall_below": bool(overall[i] < threshold and overall_total[i] > 0),
+        } for i in flagged]
+
+    def streaks(self, subject=None, since=None, until=None):
+        """Longest and current Present / Absent runs per student, in class days.
+
+        With ``subject`` a day counts if that subject was marked; otherwise a day
+        counts as present when any subject was marked Present that day and as
+        absent when marks exist but none is Present.
+        """
+        codes, _ = self.codes(since, until, [subject] if subject else None)
+        attended = (codes == PRESENT).any(axis=1)
+        missed = (codes != NO_MARK).any(axis=1) & ~attended
+        longest_present, current_present = longest_and_current_runs(attended, missed)
+        longest_absent, current_absent = longest_and_current_runs(missed, attended)
+        return [{
+            "student": student,
+            "longest_present": int(longest_present[i]), "current_present": int(current_present[i]),
+            "longest_absent": int(longest_absent[i]), "current_absent": int(current_absent[i]),
+        } for i, student in sorted(enumerate(self.students), key=lambda item: item[1])]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "students": len(self.students),
+                "subjects": len(self.subjects),
+                "first_day": self.first_day.isoformat() if self.first_day else None,
+                "days": self.days,
+                "bytes": int(self.packed.nbytes),
+                "loaded_at": self.loaded_at,
+                "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+                "skipped": self.skipped,
+            }
@@ -0,0 +1,197 @@
+"""Request and MongoDB instrumentation, exposed in the Prometheus text format.
+
+``Metrics`` keeps latency / size / DB-work histograms per route and per
+MongoDB command. ``CommandTimer`` is a pymongo command listener: every
+command is attributed to the request running on the same thread (marked
+with ``begin_request``), and commands slower than the slow-query threshold
+are logged. Commands issued outside a request (write-behind flusher, faculty
+registry reloads) only feed the per-command series.
+"""
+import logging
+import threading
+import time
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COMMAND_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+log = logging.getLogger("attender.slow_query")
+
+
+class Histogram:
+    """Cumulative-bucket histogram (not thread-safe on its own; ``Metrics`` holds the lock)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{name}_bucket", {**labels, "le": format_value(bound)}, cumulative
+        yield f"{name}_bucket", {**labels, "le": "+Inf"}, self.count
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, self.count
+
+
+class RequestStats:
+    """MongoDB work done while serving one request."""
+
+    __slots__ = ("route", "started", "db_commands", "db_seconds")
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.db_commands = 0
+        self.db_seconds = 0.0
+
+
+# name -> (type, help, buckets); counters have no buckets
+SERIES = {
+    "attender_http_request_duration_seconds": ("histogram", "Time to serve a request, body included", LATENCY_BUCKETS),
+    "attender_http_response_size_bytes": ("histogram", "Response body size", SIZE_BUCKETS),
+    "attender_http_db_commands": ("histogram", "MongoDB commands issued per request", COMMAND_COUNT_BUCKETS),
+    "attender_http_db_seconds": ("histogram", "Time spent in MongoDB per request", LATENCY_BUCKETS),
+    "attender_http_requests_total": ("counter", "Requests served", None),
+    "attender_mongo_command_duration_seconds": ("histogram", "MongoDB command round trip", LATENCY_BUCKETS),
+    "attender_mongo_command_failures_total": ("counter", "MongoDB commands that failed", None),
+    "attender_mongo_slow_commands_total": ("counter", "MongoDB commands over the slow-query threshold", None),
+}
+
+
+class Metrics:
+    def __init__(self):
+        self._series = {name: {} for name in SERIES}  # name -> {sorted label items: Histogram | int}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ---- request scope -------------------------------------------------
+    def begin_request(self, route):
+        stats = RequestStats(route)
+        self.resume_request(stats)
+        return stats
+
+    def resume_request(self, stats):
+        """Attribute this thread's MongoDB commands to ``stats`` (again, e.g. while streaming its body)."""
+        self._local.current = stats
+
+    def end_request(self):
+        self._local.current = None
+
+    def current(self):
+        return getattr(self._local, "current", None)
+
+    def observe_request(self, stats, method, status, size):
+        route = {"route": stats.route}
+        with self._lock:
+            self._observe("attender_http_request_duration_seconds", {**route, "method": method},
+                          time.perf_counter() - stats.started)
+            self._observe("attender_http_response_size_bytes", route, size)
+            self._observe("attender_http_db_commands", route, stats.db_commands)
+            self._observe("attender_http_db_seconds", route, stats.db_seconds)
+            self._inc("attender_http_requests_total", {**route, "method": method, "status": str(status)})
+
+    # ---- MongoDB commands ----------------------------------------------
+    def observe_command(self, command, seconds, failed=False, slow=False):
+        labels = {"command": command}
+        with self._lock:
+            self._observe("attender_mongo_command_duration_seconds", labels, seconds)
+            if failed:
+                self._inc("attender_mongo_command_failures_total", labels)
+            if slow:
+                self._inc("attender_mongo_slow_commands_total", labels)
+        stats = self.current()
+        if stats is not None:
+            stats.db_commands += 1
+            stats.db_seconds += seconds
+
+    # ---- exposition ----------------------------------------------------
+    def render(self):
+        """All series in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, _) in SERIES.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(self._series[name].items()):
+                    labels = dict(labels)
+                    if kind == "histogram":
+                        lines.extend(sample(*item) for item in value.samples(name, labels))
+                    else:
+                        lines.append(sample(name, labels, value))
+        return "\n".join(lines) + "\n"
+
+    def _observe(self, name, labels, value):
+        key = tuple(sorted(labels.items()))
+        series = self._series[name]
+        if key not in series:
+            series[key] = Histogram(SERIES[name][2])
+        series[key].observe(value)
+
+    def _inc(self, name, labels):
+        key = tuple(sorted(labels.items()))
+        self._series[name][key] = self._series[name].get(key, 0) + 1
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Feeds every MongoDB command into ``metrics``; logs the ones slower than ``slow_seconds``."""
+
+    def __init__(self, metrics, slow_seconds):
+        self.metrics = metrics
+        self.slow_seconds = slow_seconds
+        self._commands = {}  # (connection, request_id) -> command document, kept until the reply
+
+    def started(self, event):
+        self._commands[(event.connection_id, event.request_id)] = event.command
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed):
+        command = self._commands.pop((event.connection_id, event.request_id), None)
+        seconds = event.duration_micros / 1e6
+        slow = seconds >= self.slow_seconds
+        self.metrics.observe_command(event.command_name, seconds, failed=failed, slow=slow)
+        if slow:
+            stats = self.metrics.current()
+            log.warning(
+                "slow MongoDB %s (%.1f ms) during %s: %s",
+                event.command_name, seconds * 1000, stats.route if stats else "background work",
+                shorten(command),
+            )
+
+
+def shorten(command, limit=500):
+    text = repr({key: value for key, value in (command or {}).items() if key not in ("lsid", "$db", "$clusterTime")})
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def sample(name, labels, value):
+    if labels:
+        rendered = ",".join(f'{key}="{escape(str(val))}"' for key, val in labels.items())
+        return f"{name}{{{rendered}}} {format_value(value)}"
+    return f"{name} {format_value(value)}"
+
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
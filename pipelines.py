@@ -0,0 +1,377 @@
+"""MongoDB queries and aggregation pipelines used by the Flask backend.
+
+Dates are stored as ``YYYY-MM-DD`` strings (``str(date)`` from the dashboard),
+so date ranges are plain lexical comparisons on the ``date`` field.
+"""
+import base64
+import json
+from datetime import date
+
+# Fields a client may request with ?fields= on /get_attendance
+ATTENDANCE_FIELDS = ("student", "date", "subject", "status", "marked_by")
+MAX_PAGE_SIZE = 1000
+
+
+def parse_date(value):
+    """Normalise an optional ``YYYY-MM-DD`` string (raises ValueError if malformed)."""
+    return date.fromisoformat(value).isoformat() if value else None
+
+
+def attendance_filter(student=None, subject=None, since=None, until=None):
+    """Build a ``$match`` document for attendance records."""
+    query = {}
+    if student:
+        query["student"] = student
+    if subject:
+        query["subject"] = subject
+    if since or until:
+        query["date"] = {}
+        if since:
+            query["date"]["$gte"] = since
+        if until:
+            query["date"]["$lte"] = until
+    return query
+
+
+def encode_cursor(record):
+    """Opaque keyset cursor pointing just after ``record`` in (date, subject) order."""
+    raw = json.dumps([record["date"], record.get("subject")]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of ``encode_cursor``; raises ValueError for anything malformed."""
+    try:
+        last_date, last_subject = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError("invalid cursor") from e
+    return last_date, last_subject
+
+
+def after_cursor(cursor):
+    """Filter for records strictly after ``cursor`` in (date, subject) order."""
+    last_date, last_subject = decode_cursor(cursor)
+    return {"$or": [
+        {"date": {"$gt": last_date}},
+        {"date": last_date, "subject": {"$gt": last_subject}},
+    ]}
+
+
+def history_query(student, args):
+    """Parse ``/get_attendance`` query parameters into ``(filter, projection, fields, limit)``.
+
+    ``args`` is the request's query-string mapping. Raises ValueError for bad input.
+    """
+    limit = args.get("limit")
+    limit = int(limit) if limit else None
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    query = attendance_filter(
+        student=student,
+        subject=args.get("subject"),
+        since=parse_date(args.get("since")),
+        until=parse_date(args.get("until")),
+    )
+    if args.get("after"):
+        query.update(after_cursor(args["after"]))
+
+    fields = args.get("fields")
+    fields = fields.split(",") if fields else list(ATTENDANCE_FIELDS)
+    if not set(fields) <= set(ATTENDANCE_FIELDS):
+        raise ValueError(f"fields must be a subset of {','.join(ATTENDANCE_FIELDS)}")
+
+    # The sort keys are always fetched so the next cursor can be built
+    projection = {"_id": 0, "date": 1, "subject": 1, **{field: 1 for field in fields}}
+    return query, projection, fields, limit
+
+
+def pick_fields(record, fields):
+    return {field: record[field] for field in fields if field in record}
+
+
+def percentage(present, total):
+    """Aggregation expression for ``present / total * 100`` rounded to 2 places (0 when no classes)."""
+    return {
+        "$cond": [
+            {"$gt": [total, 0]},
+            {"$round": [{"$multiply": [{"$divide": [present, total]}, 100]}, 2]},
+            0,
+        ]
+    }
+
+
+def count_marks(group_id):
+    """``$group`` stage counting marks (``total``) and Present marks (``present``) per ``group_id``."""
+    return {"$group": {
+        "_id": group_id,
+        "total": {"$sum": 1},
+        "present": {"$sum": {"$cond": [{"$eq": ["$status", "Present"]}, 1, 0]}},
+    }}
+
+
+def sum_counters(group_id):
+    """``$group`` stage adding up ``attendance_stats`` counters per ``group_id``."""
+    return {"$group": {"_id": group_id, "total": {"$sum": "$total"}, "present": {"$sum": "$present"}}}
+
+
+def roster_pipeline(subject=None, since=None, until=None, marks="attendance", students=None):
+    """Per-student totals for the whole roster, run against the ``users`` collection.
+
+    All-time totals are read from the ``attendance_stats`` counters (one small
+    document per student and subject); a date window needs the raw marks,
+    read from the ``marks`` collection (or view). ``students`` limits the rows
+    to those usernames.
+    Output rows keep the shape the faculty dashboard expects:
+    ``Roll No / Name / Total Classes / Present Days / Attendance %``.
+    """
+    # ✅ let + $expr rather than localField with a pipeline, which needs MongoDB 5.0 (see README)
+    this_student = {"$expr": {"$eq": ["$student", "$$student"]}}
+    if since or until:
+        source = marks
+        match = {**this_student, **attendance_filter(subject=subject, since=since, until=until)}
+        stages = [{"$match": match}, count_marks(None)]
+    else:
+        source = "attendance_stats"
+        match = {**this_student, **({"subject": subject} if subject else {})}
+        stages = [{"$match": match}, sum_counters(None)]
+
+    users = {"role": "student"}
+    if students is not None:
+        users["username"] = {"$in": sorted(students)}
+
+    return [
+        {"$match": users},
+        {"$lookup": {
+            "from": source,
+            "let": {"student": "$username"},
+            "pipeline": stages,
+            "as": "stats",
+        }},
+        {"$unwind": {"path": "$stats", "preserveNullAndEmptyArrays": True}},
+        {"$project": {
+            "_id": 0,
+            "Roll No": "$username",
+            "Name": "$name",
+            "Total Classes": {"$ifNull": ["$stats.total", 0]},
+            "Present Days": {"$ifNull": ["$stats.present", 0]},
+            "Attendance %": percentage("$stats.present", "$stats.total"),
+        }},
+        {"$sort": {"Roll No": 1}},
+    ]
+
+
+def summary_pipeline(student, since=None, until=None):
+    """Per-subject and overall present/total/percentage for one student, run against ``attendance``."""
+    return [
+        {"$match": attendance_filter(student=student, since=since, until=until)},
+        count_marks({"$ifNull": ["$subject", "Unknown"]}),
+    ] + summary_stages()
+
+
+def stats_summary_pipeline(student):
+    """Same output as ``summary_pipeline`` for all-time totals, run against ``attendance_stats``."""
+    return [
+        {"$match": {"student": student}},
+        sum_counters("$subject"),
+    ] + summary_stages()
+
+
+def summary_stages():
+    """Fold per-subject ``{_id: subject, present, total}`` rows into ``{subjects: [...], overall: {...}}``."""
+    return [
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": None,
+            "subjects": {"$push": {
+                "subject": "$_id",
+                "present": "$present",
+                "total": "$total",
+                "percentage": percentage("$present", "$total"),
+            }},
+            "present": {"$sum": "$present"},
+            "total": {"$sum": "$total"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "subjects": 1,
+            "overall": {"present": "$present", "total": "$total", "percentage": percentage("$present", "$total")},
+        }},
+    ]
+
+
+def defaulters_pipeline(threshold, subjects=None, since=None, until=None, students=None):
+    """Students whose overall or any per-subject percentage is below ``threshold``.
+
+    Run it against ``attendance`` when a date window is given, otherwise
+    against the ``attendance_stats`` counters. One row per student:
+    ``{student, name, overall, subjects, below_threshold, overall_below}``.
+    ``students`` limits the check to those usernames.
+    """
+    match = attendance_filter(since=since, until=until)
+    if subjects:
+        match["subject"] = {"$in": list(subjects)}
+    if students is not None:
+        match["student"] = {"$in": sorted(students)}
+    if since or until:
+        counts = [{"$match": match}, count_marks({"student": "$student", "subject": "$subject"})]
+    else:
+        counts = [{"$match": match}, sum_counters({"student": "$student", "subject": "$subject"})]
+    # ✅ Counters emptied by deletes stay behind at 0/0: a subject without classes is not a shortfall
+    counts.append({"$match": {"total": {"$gt": 0}}})
+
+    return counts + [
+        {"$sort": {"_id.subject": 1}},
+        {"$group": {
+            "_id": "$_id.student",
+            "subjects": {"$push": {
+                "subject": "$_id.subject",
+                "present": "$present",
+                "total": "$total",
+                "percentage": percentage("$present", "$total"),
+            }},
+            "present": {"$sum": "$present"},
+            "total": {"$sum": "$total"},
+        }},
+        {"$addFields": {
+            "overall": {"present": "$present", "total": "$total", "percentage": percentage("$present", "$total")},
+            "below_threshold": {"$map": {
+                "input": {"$filter": {"input": "$subjects", "cond": {"$lt": ["$$this.percentage", threshold]}}},
+                "in": "$$this.subject",
+            }},
+        }},
+        {"$addFields": {"overall_below": {"$and": [
+            {"$gt": ["$overall.total", 0]},
+            {"$lt": ["$overall.percentage", threshold]},
+        ]}}},
+        {"$match": {"$or": [{"overall_below": True}, {"below_threshold.0": {"$exists": True}}]}},
+        {"$lookup": {
+            "from": "users",
+            "let": {"student": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$username", "$$student"]}}},
+                {"$project": {"_id": 0, "name": 1}},
+            ],
+            "as": "user",
+        }},
+        {"$project": {
+            "_id": 0,
+            "student": "$_id",
+            "name": {"$ifNull": [{"$arrayElemAt": ["$user.name", 0]}, ""]},
+            "overall": 1,
+            "subjects": 1,
+            "below_threshold": 1,
+            "overall_below": 1,
+        }},
+        {"$sort": {"student": 1}},
+    ]
+
+
+
+def calendar_pipeline(student, subject=None):
+    """One ``{date, status}`` row per day for the calendar heatmap, run against ``attendance``.
+
+    When several subjects were marked on a day, the first subject in
+    alphabetical order decides the day's status.
+    """
+    return [
+        {"$match": attendance_filter(student=student, subject=subject)},
+        {"$sort": {"date": 1, "subject": 1}},
+        {"$group": {"_id": "$date", "status": {"$first": "$status"}}},
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "date": "$_id", "status": 1}},
+    ]
+
+
+TREND_PERIODS = ("week", "month")
+
+
+def trend_series_pipeline(match, period="week", window=4):
+    """Attendance per student and period with a rolling percentage, run against ``attendance`` (MongoDB 5.0+).
+
+    ``match`` selects the marks (one student, or a subject cohort). One row per
+    student and ``period`` (``week`` starting on Monday, or ``month``) with that
+    period's ``present / total / percentage`` and ``rolling_percentage`` over the
+    last ``window`` periods that had classes, sorted by student and period.
+    """
+    day = {"$dateFromString": {"dateString": "$date", "format": "%Y-%m-%d", "onError": None, "onNull": None}}
+    truncate = {"date": day, "unit": period}
+    if period == "week":
+        truncate["startOfWeek"] = "monday"
+    period_start = {"$dateToString": {"format": "%Y-%m-%d", "date": {"$dateTrunc": truncate}}}
+    rolling = {"documents": [1 - window, 0]}
+
+    return [
+        {"$match": match},
+        count_marks({"student": "$student", "period": period_start}),
+        {"$match": {"_id.period": {"$ne": None}}},
+        {"$setWindowFields": {
+            "partitionBy": "$_id.student",
+            "sortBy": {"_id.period": 1},
+            "output": {
+                "rolling_present": {"$sum": "$present", "window": rolling},
+                "rolling_total": {"$sum": "$total", "window": rolling},
+            },
+        }},
+        {"$project": {
+            "_id": 0,
+            "student": "$_id.student",
+            "period": "$_id.period",
+            "present": 1,
+            "total": 1,
+            "percentage": percentage("$present", "$total"),
+            "rolling_percentage": percentage("$rolling_present", "$rolling_total"),
+        }},
+        {"$sort": {"student": 1, "period": 1}},
+    ]
+
+
+def absence_streaks_pipeline(match):
+    """``{student, current_absent, longest_absent}`` per student, in class days (MongoDB 5.0+).
+
+    A day is absent when it has marks but none of them is Present, as in the
+    analytics matrix.
+    """
+    attended = {"$cond": [{"$eq": ["$status", "Present"]}, 1, 0]}
+    return [
+        {"$match": match},
+        {"$group": {"_id": {"student": "$student", "date": "$date"}, "attended": {"$max": attended}}},
+        # ✅ Each attended day starts a new run; the absent days after it share its run number
+        {"$setWindowFields": {
+            "partitionBy": "$_id.student",
+            "sortBy": {"_id.date": 1},
+            "output": {"run": {"$sum": "$attended", "window": {"documents": ["unbounded", "current"]}}},
+        }},
+        {"$group": {
+            "_id": {"student": "$_id.student", "run": "$run"},
+            "absent": {"$sum": {"$subtract": [1, "$attended"]}},
+        }},
+        {"$sort": {"_id.run": -1}},
+        {"$group": {"_id": "$_id.student", "current_absent": {"$first": "$absent"}, "longest_absent": {"$max": "$absent"}}},
+        {"$project": {"_id": 0, "student": "$_id", "current_absent": 1, "longest_absent": 1}},
+    ]
+
+
+def trend_reports(series, streaks, window):
+    """Fold the rows of ``trend_series_pipeline`` and ``absence_streaks_pipeline`` into ``{student: report}``.
+
+    Both are consumed as streams (e.g. cursors). ``change`` is the latest
+    rolling percentage minus the one ``window`` periods earlier (None until
+    there is that much history); a negative value means the student is slipping.
+    """
+    reports = {}
+    for row in series:
+        student = row.pop("student")
+        reports.setdefault(student, {"series": [], "current_absent": 0, "longest_absent": 0})["series"].append(row)
+    for row in streaks:
+        report = reports.setdefault(row["student"], {"series": [], "current_absent": 0, "longest_absent": 0})
+        report["current_absent"], report["longest_absent"] = row["current_absent"], row["longest_absent"]
+
+    for report in reports.values():
+        rows = report["series"]
+        report["rolling_percentage"] = rows[-1]["rolling_percentage"] if rows else 0
+        report["change"] = (
+            round(rows[-1]["rolling_percentage"] - rows[-1 - window]["rolling_percentage"], 2)
+            if len(rows) > window else None
+        )
+    return reports
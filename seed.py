@@ -0,0 +1,86 @@
+"""Default users and the idempotent seed/migration used by ``python manage.py seed``.
+
+Faculty users carry the list of subjects they teach (see faculty.py).
+Seed passwords are written hashed (see auth.py).
+"""
+from pymongo import UpdateOne
+
+from auth import credential_update, hash_password
+
+# ✅ Default Users
+default_users = [
+    # Faculty Users
+    {"username": "kavitapatil", "password": "pass123", "role": "faculty", "name": "Kavita Patil",
+     "subjects": ["DAA"]},
+    {"username": "kirtideshpande", "password": "pass123", "role": "faculty", "name": "Kirti Deshpande",
+     "subjects": ["DBMS"]},
+    {"username": "neerajsathawane", "password": "pass123", "role": "faculty", "name": "Neeraj Sathawane",
+     "subjects": ["DAV"]},
+    {"username": "suhasinibhat", "password": "pass123", "role": "faculty", "name": "Suhasini Bhat",
+     "subjects": ["BCVS"]},
+    {"username": "raj", "password": "pass123", "role": "faculty", "name": "Raj",
+     "subjects": ["CT"]},
+    {"username": "kavitamoholkar", "password": "pass123", "role": "faculty", "name": "Kavita Moholkar",
+     "subjects": ["IPR"]},
+
+    # Student Users with Roll Numbers
+    {"username": "RBT23CB001", "password": "pass123", "role": "student", "name": "Pramay Wankhade"},
+    {"username": "RBT23CB002", "password": "pass123", "role": "student", "name": "Krushnakant Patil"},
+    {"username": "RBT23CB003", "password": "pass123", "role": "student", "name": "Kartik Kurtade"},
+    {"username": "RBT23CB004", "password": "pass123", "role": "student", "name": "Kaustubh Gawade"},
+    {"username": "RBT23CB005", "password": "pass123", "role": "student", "name": "Megh Yashwantkar"}
+]
+
+
+def dedupe_users(users):
+    """Remove copies of the same username left by older startups (keeps the oldest). Returns the count removed."""
+    removed = 0
+    duplicates = users.aggregate([
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": "$username", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ])
+    for group in duplicates:
+        removed += users.delete_many({"_id": {"$in": group["ids"][1:]}}).deleted_count
+    return removed
+
+
+def seed_users(users, seed=default_users):
+    """Insert the seed users that are missing; existing accounts are left untouched. Returns the count inserted."""
+    existing = set(users.distinct("username", {"username": {"$in": [user["username"] for user in seed]}}))
+    ops = [
+        UpdateOne({"username": user["username"]}, {"$setOnInsert": stored_user(user)}, upsert=True)
+        for user in seed if user["username"] not in existing
+    ]
+    return users.bulk_write(ops, ordered=False).upserted_count if ops else 0
+
+
+def stored_user(user):
+    """The document to insert for a seed user: the plaintext password replaced by its hash."""
+    stored = {key: value for key, value in user.items() if key != "password"}
+    stored["password_hash"] = hash_password(user["password"])
+    return stored
+
+
+def hash_legacy_passwords(users):
+    """Replace every plaintext ``password`` with a ``password_hash``. Returns the count migrated."""
+    ops = [
+        UpdateOne({"_id": user["_id"], "password": user["password"]}, credential_update(hash_password(user["password"])))
+        for user in users.find({"password": {"$exists": True}}, {"password": 1})
+    ]
+    return users.bulk_write(ops, ordered=False).modified_count if ops else 0
+
+
+def seed_faculty_subjects(users, seed=default_users):
+    """Give existing seed faculty without a ``subjects`` list their default subjects. Returns the count updated."""
+    ops = [
+        UpdateOne({"username": user["username"], "subjects": {"$exists": False}}, {"$set": {"subjects": user["subjects"]}})
+        for user in seed if user["role"] == "faculty"
+    ]
+    return users.bulk_write(ops, ordered=False).modified_count if ops else 0
+
+
+def set_faculty_subjects(users, username, subjects):
+    """Replace the subjects taught by ``username``. Returns False if there is no such faculty user."""
+    result = users.update_one({"username": username, "role": "faculty"}, {"$set": {"subjects": list(subjects)}})
+    return result.matched_count > 0
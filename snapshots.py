@@ -0,0 +1,176 @@
+"""Precomputed report snapshots: the heavy dashboard reports, materialised by a scheduled job.
+
+``run`` stores the latest roster (``/get_all_attendance``, overall and per
+subject) and defaulter list (``/defaulters`` at the configured threshold) in
+``report_snapshots``, one document per report and key::
+
+    {"report": "roster", "key": "DBMS", "version": 7, "rows": [...],
+     "generated_at": <when the rows were computed>, "as_of": <last run that checked them>}
+
+The routes serve the latest version with a single indexed ``find_one``
+unless the request says ``fresh=true`` or the snapshot is older than
+``SNAPSHOT_MAX_AGE_SECONDS``.
+
+Runs are incremental. Every counter update stamps ``attendance_stats.updated_at``
+(see marks.py), so a run recomputes only the rows of students whose counters
+changed since the snapshot's ``as_of``, or who joined or left the roster. A
+snapshot with nothing to recompute is only re-stamped, not copied. Changes to
+user names are picked up by ``full=True`` (``manage.py snapshot-reports --full``).
+
+Only one process may run at a time: two runs would both try to insert the
+next version. ``run_every`` (one thread per gunicorn worker) and
+``manage.py snapshot-reports`` therefore run only while holding the lease in
+``report_snapshot_lease``; the other workers skip their turn.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from pipelines import defaulters_pipeline, roster_pipeline
+
+COLLECTION = "report_snapshots"
+LEASE = "report_snapshot_lease"
+ROSTER, DEFAULTERS = "roster", "defaulters"
+ALL = "*"
+KEEP_VERSIONS = 3
+# Counters stamped this long before a run's start are still re-read, covering clock skew between hosts
+CLOCK_SKEW = timedelta(seconds=60)
+# Lease taken by one-off runs (manage.py); released when they finish, so this only matters if one crashes
+ONE_OFF_LEASE_SECONDS = 3600
+
+INDEXES = [
+    ([("report", ASCENDING), ("key", ASCENDING), ("version", DESCENDING)], {"name": "report_key_version_unique", "unique": True}),
+]
+
+
+def now():
+    return datetime.now(timezone.utc)
+
+
+def aware(moment):
+    """pymongo hands back naive UTC datetimes."""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def latest(db, report, key=ALL):
+    return db[COLLECTION].find_one({"report": report, "key": key}, sort=[("version", DESCENDING)])
+
+
+def is_current(snapshot, max_age):
+    return snapshot is not None and now() - aware(snapshot["as_of"]) <= timedelta(seconds=max_age)
+
+
+def counter_changes(db, since):
+    """``[(student, subject, updated_at)]`` for the counters changed after ``since``."""
+    return [
+        (doc["student"], doc.get("subject"), aware(doc["updated_at"]))
+        for doc in db.attendance_stats.find(
+            {"updated_at": {"$gt": since}}, {"_id": 0, "student": 1, "subject": 1, "updated_at": 1}
+        )
+    ]
+
+
+def changed_students(changes, key, since):
+    return {student for student, subject, updated_at in changes if updated_at > since and key in (ALL, subject)}
+
+
+def merge_rows(rows, fresh_rows, recomputed, roster, field):
+    """Old ``rows`` with the ``recomputed`` students replaced by ``fresh_rows``, limited to ``roster``."""
+    kept = [row for row in rows if row[field] not in recomputed and row[field] in roster]
+    return sorted(kept + fresh_rows, key=lambda row: row[field])
+
+
+def lease_holder():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lease(db, holder, ttl):
+    """True if ``holder`` now holds the run lease for ``ttl`` seconds: it was free, expired, or already ours."""
+    moment = now()
+    try:
+        lease = db[LEASE].find_one_and_update(
+            {"_id": "run", "$or": [{"holder": holder}, {"expires_at": {"$lte": moment}}]},
+            {"$set": {"holder": holder, "expires_at": moment + timedelta(seconds=ttl)}},
+            upsert=True, return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        return False  # held by someone else: the upsert collided with their document
+    return lease is not None
+
+
+def release_lease(db, holder):
+    db[LEASE].delete_one({"_id": "run", "holder": holder})
+
+
+def run(db, threshold, subjects, full=False, keep=KEEP_VERSIONS):
+    """Bring every snapshot up to date; returns ``{"written": [...], "unchanged": [...], "recomputed": n}``.
+
+    ``subjects`` are the roster keys to materialise besides ``ALL``.
+    """
+    started = now()
+    roster = set(db.users.distinct("username", {"role": "student"}))
+    targets = [(ROSTER, key) for key in [ALL, *sorted(subjects)]] + [(DEFAULTERS, ALL)]
+    previous = {target: latest(db, *target) for target in targets}
+    checked = [aware(doc["as_of"]) - CLOCK_SKEW for doc in previous.values() if doc]
+    changes = counter_changes(db, min(checked)) if checked and not full else None
+
+    report = {"written": [], "unchanged": [], "recomputed": 0}
+    for report_name, key in targets:
+        snapshot = previous[(report_name, key)]
+        field = "Roll No" if report_name == ROSTER else "student"
+        if changes is None or snapshot is None or snapshot["threshold"] != (threshold if report_name == DEFAULTERS else None):
+            recomputed = None  # everyone
+        else:
+            known = {row[field] for row in snapshot["rows"]}
+            recomputed = changed_students(changes, key, aware(snapshot["as_of"]) - CLOCK_SKEW)
+            if report_name == ROSTER:
+                recomputed |= roster - known  # new students get a row before their first mark
+            if not recomputed and known <= roster:
+                db[COLLECTION].update_one({"_id": snapshot["_id"]}, {"$set": {"as_of": started}})
+                report["unchanged"].append(f"{report_name}:{key}")
+                continue
+
+        if report_name == ROSTER:
+            subject = None if key == ALL else key
+            rows = list(db.users.aggregate(roster_pipeline(subject=subject, students=recomputed)))
+        else:
+            rows = list(db.attendance_stats.aggregate(defaulters_pipeline(threshold, students=recomputed), allowDiskUse=True))
+        if recomputed is not None:
+            rows = merge_rows(snapshot["rows"], rows, recomputed, roster, field)
+        report["recomputed"] += len(roster) if recomputed is None else len(recomputed)
+
+        version = snapshot["version"] + 1 if snapshot else 1
+        db[COLLECTION].insert_one({
+            "report": report_name, "key": key, "version": version, "rows": rows,
+            "threshold": threshold if report_name == DEFAULTERS else None,
+            "generated_at": started, "as_of": started,
+        })
+        db[COLLECTION].delete_many({"report": report_name, "key": key, "version": {"$lte": version - keep}})
+        report["written"].append(f"{report_name}:{key}")
+    return report
+
+
+def run_every(db, interval, threshold, subjects):
+    """Call ``run`` every ``interval`` seconds on a daemon thread; ``subjects()`` is read on each run.
+
+    Safe to start in every worker: a turn runs only in the lease holder, which
+    renews the lease each turn. If it dies, another worker takes over once
+    the lease expires (two intervals).
+    """
+    holder = lease_holder()
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                if acquire_lease(db, holder, 2 * interval):
+                    run(db, threshold, subjects())
+            except Exception as e:
+                print(f"❌ Report snapshot failed: {e}")
+    threading.Thread(target=loop, name="report-snapshots", daemon=True).start()
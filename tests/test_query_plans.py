@@ -0,0 +1,56 @@
+"""Every endpoint query must be served by an index (see indexes.py).
+
+Runs ``check_query_plans`` against the MongoDB at ``MONGO_URI`` in a
+throwaway database; skipped when no server answers.
+"""
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import MONGO_URI  # noqa: E402
+from indexes import check_query_plans, ensure_indexes  # noqa: E402
+
+TEST_DATABASE = "attender_query_plans_test"
+
+
+@pytest.fixture
+def db():
+    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        client.close()
+        pytest.skip(f"no MongoDB at {MONGO_URI}: {e}")
+    client.drop_database(TEST_DATABASE)
+    database = client[TEST_DATABASE]
+    database.users.insert_many([
+        {"username": "RBT23CB001", "role": "student", "name": "Student"},
+        {"username": "F001", "role": "faculty", "name": "Faculty", "subjects": ["DBMS"]},
+    ])
+    database.attendance.insert_one(
+        {"student": "RBT23CB001", "date": "2025-01-01", "subject": "DBMS", "status": "Present", "marked_by": "F001"}
+    )
+    database.attendance_stats.insert_one(
+        {"student": "RBT23CB001", "subject": "DBMS", "present": 1, "total": 1, "updated_at": datetime.now(timezone.utc)}
+    )
+    database.attendance_buckets.insert_one(
+        {"student": "RBT23CB001", "subject": "DBMS", "month": "2025-01", "days": {"01": {"status": "Present"}}}
+    )
+    yield database
+    client.drop_database(TEST_DATABASE)
+    client.close()
+
+
+def test_endpoint_queries_use_indexes(db):
+    report = ensure_indexes(db)
+    assert report["failed"] == []
+    results = check_query_plans(db)
+    assert results
+    collscans = [(endpoint, stages) for endpoint, stages, uses_index in results if not uses_index]
+    assert collscans == [], f"queries without IXSCAN: {collscans}"
@@ -0,0 +1,143 @@
+"""Opt-in write-behind queue for attendance marks (``WRITE_BEHIND=1``).
+
+Validated marks are put on a bounded in-process queue and a single flusher
+thread writes them with ``marks.write_marks`` in batches of up to
+``batch_size`` marks or every ``interval`` seconds, whichever comes first.
+Each ``submit`` returns a ``concurrent.futures.Future`` resolved with the
+mark's error message (``None`` on success) once its batch is written, so
+the caller chooses its durability:
+
+``buffered``   acknowledge as soon as the mark is queued (lost if the
+               process dies before the next flush)
+``flushed``    wait for the batch write
+``journaled``  wait for the batch write with ``j=True``
+
+A full queue raises ``QueueFull`` (the API answers 503) instead of growing
+without bound, and ``close`` drains everything still queued.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from pymongo import WriteConcern
+
+from marks import mark_key, write_marks
+
+log = logging.getLogger(__name__)
+
+DURABILITY_LEVELS = ("buffered", "flushed", "journaled")
+QueueFull = queue.Full
+_STOP = object()
+
+
+class WriteBehindQueue:
+    def __init__(self, db, batch_size=500, interval=0.05, maxsize=10000, durability="buffered",
+                 put_timeout=0.5, on_flush=None):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"durability must be one of {', '.join(DURABILITY_LEVELS)}")
+        self.db = db.with_options(write_concern=WriteConcern(j=True)) if durability == "journaled" else db
+        self.batch_size = batch_size
+        self.interval = interval
+        self.durability = durability
+        self.put_timeout = put_timeout
+        self.on_flush = on_flush  # called with (marks, errors) after each batch
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = False
+        self.batches = self.flushed = self.failed = self.rejected = 0
+        self._thread = threading.Thread(target=self._run, name="attendance-write-behind", daemon=True)
+        self._thread.start()
+
+    @property
+    def waits_for_flush(self):
+        return self.durability != "buffered"
+
+    def submit(self, mark):
+        """Queue one mark; raises ``QueueFull`` if the queue stays full for ``put_timeout`` seconds."""
+        if self._closed:
+            raise RuntimeError("write-behind queue is closed")
+        future = Future()
+        try:
+            self._queue.put((mark, future), timeout=self.put_timeout)
+        except queue.Full:
+            self.rejected += 1
+            raise
+        return future
+
+    def close(self, timeout=30):
+        """Stop accepting marks and wait until everything queued has been written."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "durability": self.durability,
+            "queued": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "batches": self.batches,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True  # flush this batch, then drain what is left below
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.batch_size):
+            self._flush(leftover[start:start + self.batch_size])
+
+    def _flush(self, batch):
+        # Unordered bulk writes may apply ops in any order, so keep only the latest mark per session
+        latest = {}
+        for index, (mark, _) in enumerate(batch):
+            latest[mark_key(mark)] = index
+        marks = [batch[index][0] for index in sorted(latest.values())]
+
+        try:
+            errors = write_marks(self.db, marks, ordered=False)
+        except Exception as e:
+            log.exception("write-behind flush of %d marks failed", len(batch))
+            self.failed += len(batch)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        by_key = {mark_key(mark): error for mark, error in zip(marks, errors)}
+        for mark, future in batch:
+            future.set_result(by_key[mark_key(mark)])
+        self.batches += 1
+        self.flushed += sum(error is None for error in errors)
+        self.failed += sum(error is not None for error in errors)
+        if self.on_flush is not None:
+            try:
+                self.on_flush(marks, errors)
+            except Exception:
+                log.exception("write-behind flush callback failed")
@@ -0,0 +1,31 @@
+"""Production entry point for the Flask API.
+
+    gunicorn -c gunicorn.conf.py                         # WEB_WORKERS processes × WEB_THREADS threads
+    waitress-serve --threads 8 --call wsgi:create_app    # one process, e.g. on Windows
+    python wsgi.py                                       # the same with waitress, from WEB_BIND / WEB_THREADS
+
+main.py opens its MongoDB client and starts its background threads (faculty
+registry watch, analytics reloads, write-behind flusher, report snapshots)
+when it is imported. A forked child inherits neither working pool sockets nor
+threads, so each worker has to import it itself: ``create_app`` does the
+import, and gunicorn.conf.py keeps ``preload_app`` off so that happens after
+the fork.
+"""
+import sys
+
+from config import WEB_BIND, WEB_THREADS
+
+
+def create_app():
+    """The Flask app, with this process's own MongoDB client and background threads."""
+    import main
+    return main.app
+
+
+if __name__ == "__main__":
+    try:
+        from waitress import serve
+    except ImportError:
+        sys.exit("❌ waitress is not installed (pip install waitress), or run: gunicorn -c gunicorn.conf.py")
+    host, _, port = WEB_BIND.rpartition(":")
+    serve(create_app(), host=host or "127.0.0.1", port=int(port), threads=WEB_THREADS)